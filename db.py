@@ -1,11 +1,13 @@
 ﻿# db.py
 import os
 import logging
+import threading
 from contextlib import contextmanager
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, List, Dict, Tuple
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 
 logger = logging.getLogger(__name__)
 
@@ -23,22 +25,62 @@ def get_conn():
     return conn
 
 
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "20"))
+
+_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool זורק PoolError כשהוא מלא – הסמפור גורם לממתינים לחכות
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+
+def get_pool() -> Optional[psycopg2.pool.ThreadedConnectionPool]:
+    """מחזיר pool חיבורים משותף (נוצר בפעם הראשונה) או None אם אין DATABASE_URL"""
+    global _pool
+    if not DATABASE_URL:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    DATABASE_URL,
+                    cursor_factory=psycopg2.extras.DictCursor,
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    """סוגר את כל החיבורים ב-pool (בכיבוי השרת)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
 @contextmanager
 def db_cursor():
-    conn = get_conn()
-    if conn is None:
+    pool = get_pool()
+    if pool is None:
         yield None, None
         return
-    try:
-        cur = conn.cursor()
-        yield conn, cur
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        cur.close()
-        conn.close()
+    with _pool_slots:
+        conn = pool.getconn()
+        cur = None
+        try:
+            cur = conn.cursor()
+            yield conn, cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if cur is not None:
+                cur.close()
+            # חיבור שנסגר בצד השרת לא חוזר ל-pool
+            pool.putconn(conn, close=bool(conn.closed))
 
 
 def init_schema() -> None:
@@ -81,6 +123,7 @@ def init_schema() -> None:
             );
             """
         )
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS language TEXT;")
 
         # referrals – הפניות
         cur.execute(
@@ -197,6 +240,82 @@ def store_user(user_id: int, username: Optional[str]) -> None:
         )
 
 
+def store_user_if_new(
+    user_id: int,
+    username: Optional[str],
+    referrer_id: Optional[int] = None,
+    source: str = "bot_start",
+) -> bool:
+    """
+    שומר/מעדכן משתמש בטבלת users בשאילתה אחת.
+    אם הועבר referrer_id – רושם גם הפנייה באותה טרנזקציה, רק אם למשתמש
+    עוד אין הפנייה קודמת.
+    מחזיר True אם המשתמש נוצר עכשיו (משתמש חדש), אחרת False.
+    """
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return False
+        # xmax = 0 רק בשורה שנוספה עכשיו (לא בשורה שעודכנה ב-ON CONFLICT)
+        cur.execute(
+            """
+            INSERT INTO users (id, username, first_seen_at)
+            VALUES (%s, %s, NOW())
+            ON CONFLICT (id) DO UPDATE
+              SET username = EXCLUDED.username
+            RETURNING (xmax = 0) AS inserted;
+            """,
+            (user_id, username),
+        )
+        row = cur.fetchone()
+        if referrer_id is not None and referrer_id != user_id:
+            # SAVEPOINT – הפניה שגויה (למשל מזהה מחוץ לטווח) לא מבטלת את רישום המשתמש
+            cur.execute("SAVEPOINT store_user_referral;")
+            try:
+                cur.execute(
+                    """
+                    INSERT INTO referrals (referrer_id, referred_id, source, points)
+                    SELECT %s, %s, %s, 1
+                    WHERE NOT EXISTS (SELECT 1 FROM referrals WHERE referred_id = %s);
+                    """,
+                    (referrer_id, user_id, source, user_id),
+                )
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT store_user_referral;")
+                logger.error("Failed to store referral %s -> %s: %s", referrer_id, user_id, e)
+            else:
+                cur.execute("RELEASE SAVEPOINT store_user_referral;")
+        return bool(row["inserted"]) if row else False
+
+
+def get_user_bootstrap(user_id: int) -> Tuple[bool, int, Optional[str]]:
+    """
+    כל מה ש-/start צריך על המשתמש בשאילתה אחת:
+    (האם קיים, מספר תשלומים ממתינים מעל 24 שעות, שפה שמורה או None).
+    """
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return False, 0, None
+        cur.execute(
+            """
+            SELECT
+              EXISTS (SELECT 1 FROM users WHERE id = %s) AS user_exists,
+              (
+                SELECT COUNT(*)
+                FROM payments
+                WHERE user_id = %s
+                  AND status = 'pending'
+                  AND created_at < NOW() - INTERVAL '24 hours'
+              ) AS pending_count,
+              (SELECT language FROM users WHERE id = %s) AS language;
+            """,
+            (user_id, user_id, user_id),
+        )
+        row = cur.fetchone()
+        if not row:
+            return False, 0, None
+        return bool(row["user_exists"]), int(row["pending_count"] or 0), row["language"]
+
+
 def add_referral(referrer_id: int, referred_id: int, source: str) -> None:
     """
     מוסיף רשומת הפנייה.
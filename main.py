@@ -1,16 +1,32 @@
 import os
+import re
+import sys
+import time
+import asyncio
 import logging
-from collections import deque
+import logging.handlers
+import atexit
+import queue
+import importlib
+import importlib.util
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Deque, Set, Literal, Optional, Dict, Any, List
+from typing import Literal, Optional, Dict, Any, List, Tuple, Callable
 import json
 
+import orjson
+from cachetools import TTLCache
+
 from fastapi import FastAPI, Request, Response, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import HTMLResponse
 from telegram import (
     Update,
+    User,
+    Message,
+    MessageEntity,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     ReplyKeyboardMarkup,
@@ -18,6 +34,7 @@ from telegram import (
     ReplyKeyboardRemove
 )
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     MessageHandler,
@@ -25,18 +42,30 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
+from telegram.error import TimedOut
 
 # =========================
 # לוגינג מתקדם
 # =========================
+# ה-handlers עצמם (מסוף + קובץ) רצים ב-thread של QueueListener – קריאה ל-logger
+# מתוך handler אסינכרוני רק מכניסה רשומה לתור ולא כותבת לדיסק
+_log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+_log_output_handlers = [
+    logging.StreamHandler(),
+    logging.FileHandler("bot.log", encoding='utf-8'),
+]
+for _handler in _log_output_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *_log_output_handlers, respect_handler_level=True
+)
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("bot.log", encoding='utf-8')
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)],
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("gateway-bot")
 
 # =========================
@@ -48,6 +77,8 @@ try:
         log_payment,
         update_payment_status,
         store_user,
+        store_user_if_new,
+        get_user_bootstrap,
         add_referral,
         get_top_referrers,
         get_monthly_payments,
@@ -58,10 +89,9 @@ try:
         get_promoter_summary,
         incr_metric,
         get_metric,
-        get_user_language,
+        get_user_language as db_get_user_language,
         update_user_language,
-        get_pending_payments_count,
-        get_user
+        close_pool,
     )
     DB_AVAILABLE = True
     logger.info("DB module loaded successfully, DB logging enabled.")
@@ -101,10 +131,10 @@ def validate_bot_token(token: str) -> bool:
             logger.info("✅ Bot token is valid")
             return True
         else:
-            logger.warning(f"⚠️ BOT_TOKEN may be invalid. Telegram API returned: {response.status_code}")
+            logger.warning("⚠️ BOT_TOKEN may be invalid. Telegram API returned: %s", response.status_code)
             return False
     except Exception as e:
-        logger.warning(f"⚠️ Failed to validate BOT_TOKEN: {e}")
+        logger.warning("⚠️ Failed to validate BOT_TOKEN: %s", e)
         return False
 
 # הרץ את הבדיקה
@@ -121,10 +151,16 @@ SUPPORT_GROUP_LINK = os.environ.get("SUPPORT_GROUP_LINK", "https://t.me/+1ANn25H
 DEVELOPER_USER_ID = 224223270
 PAYMENTS_LOG_CHAT_ID = int(os.environ.get("PAYMENTS_LOG_CHAT_ID", "-1001748319682") or "-1001748319682")
 
+# הלינק תלוי רק ב-user_id וב-BOT_USERNAME (קבוע) – נבנה פעם אחת לכל משתמש
+@lru_cache(maxsize=10000)
 def build_personal_share_link(user_id: int) -> str:
     base_username = BOT_USERNAME or "Buy_My_Shop_bot"
     return f"https://t.me/{base_username}?start=ref_{user_id}"
 
+# "/start ref_<id>" מלינק אישי – קוד לא תקין פשוט לא תואם, בלי חריגות
+# עד 18 ספרות – תמיד בטווח BIGINT של Postgres (מזהי טלגרם קצרים בהרבה)
+_REF_RE = re.compile(r"^/start(?:@\w+)?\s+ref_(\d{1,18})$")
+
 # לינקי תשלום
 PAYBOX_URL = os.environ.get("PAYBOX_URL", "https://links.payboxapp.com/1SNfaJ6XcYb")
 BIT_URL = os.environ.get("BIT_URL", "https://www.bitpay.co.il/app/share-info?i=190693822888_19l4oyvE")
@@ -146,198 +182,307 @@ BANK_DETAILS = (
     "סכום: *39 ש\"ח*\n"
 )
 
-ADMIN_IDS = {DEVELOPER_USER_ID}
+ADMIN_IDS: frozenset = frozenset({DEVELOPER_USER_ID})
+# בפריסה עם מנהל יחיד – השוואת int ישירה לפני בדיקת ה-set
+_SINGLE_ADMIN_ID: Optional[int] = next(iter(ADMIN_IDS)) if len(ADMIN_IDS) == 1 else None
 PayMethod = Literal["bank", "paybox", "ton"]
 
 # =========================
 # מערכת תרגום
 # =========================
-class TranslationManager:
-    def __init__(self):
-        self.translations = {
-            'he': self._hebrew_translations(),
-            'en': self._english_translations(),
-            'ru': self._russian_translations(),
-            'ar': self._arabic_translations()
-        }
-    
-    def _hebrew_translations(self):
-        return {
-            # תפריט ראשי
-            "welcome": "🎉 *ברוך הבא לנכס הדיגיטלי המניב שלך!*",
-            "main_menu": "📱 *תפריט ראשי*",
-            "join_community": "🚀 הצטרפות לקהילת העסקים (39 ₪)",
-            "digital_asset_info": "💎 מה זה הנכס הדיגיטלי?",
-            "share_gateway": "🔗 שתף את שער הקהילה",
-            "slh_vision": "🌟 חזון SLH",
-            "my_area": "👤 האזור האישי שלי",
-            "support": "🆘 תמיכה",
-            
-            # תשלומים
-            "payment_received": "✅ *אישור התשלום התקבל!*",
-            "payment_under_review": "האישור נשלח לצוות שלנו לאימות.\nתקבל הודעה עם הנכס הדיגיטלי שלך בתוך זמן קצר.",
-            "payment_approved": "🎉 *התשלום אושר! ברוך הבא לבעלי הנכסים!*",
-            "payment_rejected": "❌ *אישור התשלום נדחה*",
-            
-            # כפתורים
-            "back": "⬅ חזרה",
-            "approve": "✅ אשר תשלום",
-            "reject": "❌ דחה תשלום",
-            "bank_transfer": "🏦 העברה בנקאית",
-            "bit_paybox": "📲 ביט / פייבוקס / PayPal",
-            "ton_payment": "💎 טלגרם (TON)",
-            
-            # הודעות מערכת
-            "new_user_start": "🚀 *הפעלת בוט חדשה - Buy_My_Shop*",
-            "payment_confirmation": "💰 *אישור תשלום חדש התקבל!*",
-            "admin_approval_notice": "👤 *נדרשת אישור מנהל*"
-        }
-    
-    def _english_translations(self):
-        return {
-            "welcome": "🎉 *Welcome to your profitable digital asset!*",
-            "main_menu": "📱 *Main Menu*",
-            "join_community": "🚀 Join Business Community (39 ₪)",
-            "digital_asset_info": "💎 What is the Digital Asset?",
-            "share_gateway": "🔗 Share Community Gateway",
-            "slh_vision": "🌟 SLH Vision",
-            "my_area": "👤 My Personal Area",
-            "support": "🆘 Support",
-            
-            "payment_received": "✅ *Payment Confirmation Received!*",
-            "payment_under_review": "The confirmation has been sent to our team for verification.\nYou will receive your digital asset shortly.",
-            "payment_approved": "🎉 *Payment Approved! Welcome Asset Owner!*",
-            "payment_rejected": "❌ *Payment Approval Rejected*",
-            
-            "back": "⬅ Back",
-            "approve": "✅ Approve Payment",
-            "reject": "❌ Reject Payment",
-            "bank_transfer": "🏦 Bank Transfer",
-            "bit_paybox": "📲 Bit / Paybox / PayPal",
-            "ton_payment": "💎 Telegram (TON)",
-            
-            "new_user_start": "🚀 *New Bot Activation - Buy_My_Shop*",
-            "payment_confirmation": "💰 *New Payment Confirmation Received!*",
-            "admin_approval_notice": "👤 *Admin Approval Required*"
-        }
-    
-    def _russian_translations(self):
-        return {
-            "welcome": "🎉 *Добро пожаловать в ваш прибыльный цифровой актив!*",
-            "main_menu": "📱 *Главное меню*",
-            "join_community": "🚀 Присоединиться к бизнес-сообществу (39 ₪)",
-            "digital_asset_info": "💎 Что такое цифровой актив?",
-            "share_gateway": "🔗 Поделиться входом в сообщество",
-            "slh_vision": "🌟 Видение SLH",
-            "my_area": "👤 Мой личный кабинет",
-            "support": "🆘 Поддержка",
-            
-            "payment_received": "✅ *Подтверждение оплаты получено!*",
-            "payment_under_review": "Подтверждение отправлено нашей команде для проверки.\nВы получите ваш цифровой актив в ближайшее время.",
-            "payment_approved": "🎉 *Оплата подтверждена! Добро пожаловать, владелец актива!*",
-            "payment_rejected": "❌ *Подтверждение оплаты отклонено*",
-            
-            "back": "⬅ Назад",
-            "approve": "✅ Подтвердить оплату",
-            "reject": "❌ Отклонить оплату",
-            "bank_transfer": "🏦 Банковский перевод",
-            "bit_paybox": "📲 Bit / Paybox / PayPal",
-            "ton_payment": "💎 Telegram (TON)",
-            
-            "new_user_start": "🚀 *Новая активация бота - Buy_My_Shop*",
-            "payment_confirmation": "💰 *Получено новое подтверждение оплаты!*",
-            "admin_approval_notice": "👤 *Требуется подтверждение администратора*"
-        }
-    
-    def _arabic_translations(self):
-        return {
-            "welcome": "🎉 *مرحبًا بك في أصولك الرقمية المربحة!*",
-            "main_menu": "📱 *القائمة الرئيسية*",
-            "join_community": "🚀 الانضمام إلى مجتمع الأعمال (39 ₪)",
-            "digital_asset_info": "💎 ما هي الأصول الرقمية؟",
-            "share_gateway": "🔗 مشارحة بوابة المجتمع",
-            "slh_vision": "🌟 رؤية SLH",
-            "my_area": "👤 منطقتي الشخصية",
-            "support": "🆘 الدعم",
-            
-            "payment_received": "✅ *تم استلام تأكيد الدفع!*",
-            "payment_under_review": "تم إرسال التأكيد إلى فريقنا للتحقق.\nستستلم أصولك الرقمية قريبًا.",
-            "payment_approved": "🎉 *تمت الموافقة على الدفع! مرحبًا بك مالک الأصول!*",
-            "payment_rejected": "❌ *تم رفض تأكيد الدفع*",
-            
-            "back": "⬅ رجوع",
-            "approve": "✅ الموافقة على الدفع",
-            "reject": "❌ رفض الدفع",
-            "bank_transfer": "🏦 تحويل بنكي",
-            "bit_paybox": "📲 بت / Paybox / PayPal",
-            "ton_payment": "💎 Telegram (TON)",
-            
-            "new_user_start": "🚀 *تفعيل بوت جديد - Buy_My_Shop*",
-            "payment_confirmation": "💰 *تم استلام تأكيد دفع جديد!*",
-            "admin_approval_notice": "👤 *مطلوب موافقة المسؤول*"
-        }
-    
-    def get_text(self, key: str, lang: str = 'he') -> str:
-        """מחזיר טקסט מתורגם"""
-        return self.translations.get(lang, self.translations['he']).get(key, key)
-    
-    def get_user_language(self, user_id: int) -> str:
-        """מחזיר את שפת המשתמש"""
-        if not DB_AVAILABLE:
-            return 'he'
-        try:
-            return get_user_language(user_id) or 'he'
-        except Exception:
-            return 'he'
+_TRANSLATIONS: Dict[str, Dict[str, str]] = {
+    'he': {
+        # תפריט ראשי
+        "welcome": "🎉 *ברוך הבא לנכס הדיגיטלי המניב שלך!*",
+        "main_menu": "📱 *תפריט ראשי*",
+        "join_community": "🚀 הצטרפות לקהילת העסקים (39 ₪)",
+        "digital_asset_info": "💎 מה זה הנכס הדיגיטלי?",
+        "share_gateway": "🔗 שתף את שער הקהילה",
+        "slh_vision": "🌟 חזון SLH",
+        "my_area": "👤 האזור האישי שלי",
+        "support": "🆘 תמיכה",
+        
+        # תשלומים
+        "payment_received": "✅ *אישור התשלום התקבל!*",
+        "payment_under_review": "האישור נשלח לצוות שלנו לאימות.\nתקבל הודעה עם הנכס הדיגיטלי שלך בתוך זמן קצר.",
+        "payment_approved": "🎉 *התשלום אושר! ברוך הבא לבעלי הנכסים!*",
+        "payment_rejected": "❌ *אישור התשלום נדחה*",
+        
+        # כפתורים
+        "back": "⬅ חזרה",
+        "approve": "✅ אשר תשלום",
+        "reject": "❌ דחה תשלום",
+        "bank_transfer": "🏦 העברה בנקאית",
+        "bit_paybox": "📲 ביט / פייבוקס / PayPal",
+        "ton_payment": "💎 טלגרם (TON)",
+        
+        # הודעות מערכת
+        "new_user_start": "🚀 *הפעלת בוט חדשה - Buy_My_Shop*",
+        "payment_confirmation": "💰 *אישור תשלום חדש התקבל!*",
+        "admin_approval_notice": "👤 *נדרשת אישור מנהל*"
+    },
+    'en': {
+        "welcome": "🎉 *Welcome to your profitable digital asset!*",
+        "main_menu": "📱 *Main Menu*",
+        "join_community": "🚀 Join Business Community (39 ₪)",
+        "digital_asset_info": "💎 What is the Digital Asset?",
+        "share_gateway": "🔗 Share Community Gateway",
+        "slh_vision": "🌟 SLH Vision",
+        "my_area": "👤 My Personal Area",
+        "support": "🆘 Support",
+        
+        "payment_received": "✅ *Payment Confirmation Received!*",
+        "payment_under_review": "The confirmation has been sent to our team for verification.\nYou will receive your digital asset shortly.",
+        "payment_approved": "🎉 *Payment Approved! Welcome Asset Owner!*",
+        "payment_rejected": "❌ *Payment Approval Rejected*",
+        
+        "back": "⬅ Back",
+        "approve": "✅ Approve Payment",
+        "reject": "❌ Reject Payment",
+        "bank_transfer": "🏦 Bank Transfer",
+        "bit_paybox": "📲 Bit / Paybox / PayPal",
+        "ton_payment": "💎 Telegram (TON)",
+        
+        "new_user_start": "🚀 *New Bot Activation - Buy_My_Shop*",
+        "payment_confirmation": "💰 *New Payment Confirmation Received!*",
+        "admin_approval_notice": "👤 *Admin Approval Required*"
+    },
+    'ru': {
+        "welcome": "🎉 *Добро пожаловать в ваш прибыльный цифровой актив!*",
+        "main_menu": "📱 *Главное меню*",
+        "join_community": "🚀 Присоединиться к бизнес-сообществу (39 ₪)",
+        "digital_asset_info": "💎 Что такое цифровой актив?",
+        "share_gateway": "🔗 Поделиться входом в сообщество",
+        "slh_vision": "🌟 Видение SLH",
+        "my_area": "👤 Мой личный кабинет",
+        "support": "🆘 Поддержка",
+        
+        "payment_received": "✅ *Подтверждение оплаты получено!*",
+        "payment_under_review": "Подтверждение отправлено нашей команде для проверки.\nВы получите ваш цифровой актив в ближайшее время.",
+        "payment_approved": "🎉 *Оплата подтверждена! Добро пожаловать, владелец актива!*",
+        "payment_rejected": "❌ *Подтверждение оплаты отклонено*",
+        
+        "back": "⬅ Назад",
+        "approve": "✅ Подтвердить оплату",
+        "reject": "❌ Отклонить оплату",
+        "bank_transfer": "🏦 Банковский перевод",
+        "bit_paybox": "📲 Bit / Paybox / PayPal",
+        "ton_payment": "💎 Telegram (TON)",
+        
+        "new_user_start": "🚀 *Новая активация бота - Buy_My_Shop*",
+        "payment_confirmation": "💰 *Получено новое подтверждение оплаты!*",
+        "admin_approval_notice": "👤 *Требуется подтверждение администратора*"
+    },
+    'ar': {
+        "welcome": "🎉 *مرحبًا بك في أصولك الرقمية المربحة!*",
+        "main_menu": "📱 *القائمة الرئيسية*",
+        "join_community": "🚀 الانضمام إلى مجتمع الأعمال (39 ₪)",
+        "digital_asset_info": "💎 ما هي الأصول الرقمية؟",
+        "share_gateway": "🔗 مشارحة بوابة المجتمع",
+        "slh_vision": "🌟 رؤية SLH",
+        "my_area": "👤 منطقتي الشخصية",
+        "support": "🆘 الدعم",
+        
+        "payment_received": "✅ *تم استلام تأكيد الدفع!*",
+        "payment_under_review": "تم إرسال التأكيد إلى فريقنا للتحقق.\nستستلم أصولك الرقمية قريبًا.",
+        "payment_approved": "🎉 *تمت الموافقة على الدفع! مرحبًا بك مالک الأصول!*",
+        "payment_rejected": "❌ *تم رفض تأكيد الدفع*",
+        
+        "back": "⬅ رجوع",
+        "approve": "✅ الموافقة على الدفع",
+        "reject": "❌ رفض الدفع",
+        "bank_transfer": "🏦 تحويل بنكي",
+        "bit_paybox": "📲 بت / Paybox / PayPal",
+        "ton_payment": "💎 Telegram (TON)",
+        
+        "new_user_start": "🚀 *تفعيل بوت جديد - Buy_My_Shop*",
+        "payment_confirmation": "💰 *تم استلام تأكيد دفع جديد!*",
+        "admin_approval_notice": "👤 *مطلوب موافقة المسؤول*"
+    },
+}
+
+@lru_cache(maxsize=1024)
+def get_text(key: str, lang: str = 'he') -> str:
+    """מחזיר טקסט מתורגם (התרגומים קבועים – התוצאה נשמרת במטמון)"""
+    return _TRANSLATIONS.get(lang, _TRANSLATIONS['he']).get(key, key)
+
+# קודי השפות הנתמכות -> עותק קנוני (interned) של הקוד.
+# שפה שעברה normalize_lang תמיד קיימת בכל מילוני הטקסטים – אפשר לאנדקס ישירות.
+_LANGS: Dict[str, str] = {code: sys.intern(code) for code in _TRANSLATIONS}
+
+def normalize_lang(lang: Optional[str]) -> str:
+    """מחזיר קוד שפה נתמך (ברירת מחדל: עברית)"""
+    return _LANGS.get(lang, 'he') if lang else 'he'
+
+_LANG_CACHE_MAX = 10000
+_LANG_CACHE_TTL = 60
+# מטמון LRU חסום עם TTL לשפת משתמש – חוסך שאילתת DB בכל handler
+_LANG_CACHE: TTLCache = TTLCache(maxsize=_LANG_CACHE_MAX, ttl=_LANG_CACHE_TTL)
+
+def get_user_language(user_id: int) -> str:
+    """מחזיר את שפת המשתמש"""
+    if not DB_AVAILABLE:
+        return 'he'
+    lang = _LANG_CACHE.get(user_id)
+    if lang is not None:
+        return lang
+    try:
+        lang = normalize_lang(db_get_user_language(user_id))
+    except Exception:
+        return 'he'
+    _LANG_CACHE[user_id] = lang
+    return lang
 
-trans_manager = TranslationManager()
+def cache_user_language(user_id: int, lang: str) -> None:
+    """שומר במטמון שפה שכבר נקראה מה-DB בשאילתה אחרת"""
+    _LANG_CACHE[user_id] = normalize_lang(lang)
+
+def invalidate_user_language(user_id: int) -> None:
+    """מסיר את שפת המשתמש מהמטמון (אחרי שינוי שפה)"""
+    _LANG_CACHE.pop(user_id, None)
+
+def get_context_language(context: ContextTypes.DEFAULT_TYPE, user) -> str:
+    """
+    מחזיר את שפת המשתמש של העדכון הנוכחי.
+    המקור היחיד הוא _LANG_CACHE (עם TTL) / DB – לא שומרים ב-user_data,
+    שנשאר לכל חיי התהליך ועוקף את ה-TTL ואת invalidate_user_language.
+    """
+    if not user:
+        return 'he'
+    return get_user_language(user.id)
 
 # =========================
 # Dedup – מניעת כפילות
 # =========================
-_processed_ids: Deque[int] = deque(maxlen=1000)
-_processed_set: Set[int] = set()
+_DEDUP_MAX = 1000
+# מבנה אחד שמחזיק גם סדר הכנסה (FIFO) וגם בדיקת חברות ב-O(1)
+_processed: "OrderedDict[int, None]" = OrderedDict()
 
 def is_duplicate_update(update: Update) -> bool:
     if update is None:
         return False
     uid = update.update_id
-    if uid in _processed_set:
+    if uid in _processed:
         return True
-    _processed_set.add(uid)
-    _processed_ids.append(uid)
-    if len(_processed_set) > len(_processed_ids) + 10:
-        valid = set(_processed_ids)
-        _processed_set.intersection_update(valid)
+    _processed[uid] = None
+    if len(_processed) > _DEDUP_MAX:
+        _processed.popitem(last=False)
     return False
 
+# =========================
+# חותמת זמן להודעות לוג
+# =========================
+# המחרוזת מפורמטת מחדש רק כשהשנייה מתחלפת – strftime לא רץ בכל עדכון
+_TS_CACHE: Dict[str, Any] = {"t": 0, "s": ""}
+
+def _now_str() -> str:
+    now = int(time.time())
+    if now != _TS_CACHE["t"]:
+        _TS_CACHE["s"] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+        _TS_CACHE["t"] = now
+    return _TS_CACHE["s"]
+
 # =========================
 # זיכרון פשוט לתשלומים
 # =========================
+_PENDING_COUNT_CACHE_TTL = 30
+# מספר תשלומים תלויים לפי משתמש – חוסך את שאילתת ה-bootstrap ב-/start חוזר.
+# מתאפס בכל שינוי סטטוס תשלום של המשתמש.
+_PENDING_COUNT_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=_PENDING_COUNT_CACHE_TTL)
+
+def invalidate_pending_payments(user_id: int) -> None:
+    _PENDING_COUNT_CACHE.pop(user_id, None)
+
+_HAS_ASSET_TTL = 300
+# האם למשתמש יש נכס (promoter) – לחיצות חוזרות על "שתף" לא פונות ל-DB.
+# מתאפס כשתשלום של המשתמש מאושר.
+_HAS_ASSET: TTLCache = TTLCache(maxsize=10_000, ttl=_HAS_ASSET_TTL)
+
+_PAYMENTS_STORE_MAX = 10_000
+_PAYMENTS_STORE_TTL = 24 * 60 * 60
+
 def get_payments_store(context: ContextTypes.DEFAULT_TYPE) -> Dict[int, Dict[str, Any]]:
-    store = context.application.bot_data.get("payments")
+    # חסום בגודל ובזמן – תשלום שלא טופל תוך 24 שעות נמחק מהזיכרון
+    bot_data = context.application.bot_data
+    store = bot_data.get("payments")
     if store is None:
-        store = {}
-        context.application.bot_data["payments"] = store
+        store = bot_data["payments"] = TTLCache(maxsize=_PAYMENTS_STORE_MAX, ttl=_PAYMENTS_STORE_TTL)
     return store
 
+_PENDING_REJECTS_MAX = 1024
+_PENDING_REJECTS_TTL = 3600
+
 def get_pending_rejects(context: ContextTypes.DEFAULT_TYPE) -> Dict[int, int]:
-    store = context.application.bot_data.get("pending_rejects")
-    if store is None:
-        store = {}
-        context.application.bot_data["pending_rejects"] = store
-    return store
+    # admin_id -> target_id; דחייה שהאדמין לא השלים תוך שעה פשוט פגה
+    bot_data = context.application.bot_data
+    pending = bot_data.get("pending_rejects")
+    if pending is None:
+        pending = bot_data["pending_rejects"] = TTLCache(
+            maxsize=_PENDING_REJECTS_MAX, ttl=_PENDING_REJECTS_TTL
+        )
+    return pending
 
 # =========================
 # אפליקציית Telegram
 # =========================
+# AIORateLimiter שומר על מגבלות טלגרם ומנסה שוב אחרי RetryAfter:
+# 30 הודעות/שנייה לבוט כולו, 20 הודעות/דקה לכל קבוצה (כולל קבוצת הלוגים)
+_TG_OVERALL_RATE = 30
+_TG_OVERALL_PERIOD = 1
+_TG_GROUP_RATE = 20
+_TG_GROUP_PERIOD = 60
+_TG_MAX_RETRIES = 3
+
 ptb_app: Application = (
     Application.builder()
     .updater(None)
     .token(BOT_TOKEN)
+    .rate_limiter(AIORateLimiter(
+        overall_max_rate=_TG_OVERALL_RATE,
+        overall_time_period=_TG_OVERALL_PERIOD,
+        group_max_rate=_TG_GROUP_RATE,
+        group_time_period=_TG_GROUP_PERIOD,
+        max_retries=_TG_MAX_RETRIES,
+    ))
+    # עדכונים מצ'אטים שונים מטופלים במקביל – handler איטי לא חוסם משתמשים אחרים
+    .concurrent_updates(True)
     .build()
 )
 
+# =========================
+# תור הודעות לקבוצת הלוגים
+# =========================
+# הודעות לקבוצת התשלומים עוברות בתור חסום עם worker יחיד (עד הודעה לשנייה),
+# כך שהצפה של לוגים לא דוחקת הודעות למשתמשים ולא מחזיקה את ה-handler.
+_PAYMENTS_LOG_QUEUE_MAX = 500
+_PAYMENTS_LOG_INTERVAL = 1.0
+# זמן מקסימלי לריקון התור בכיבוי השרת, לפני עצירת ptb_app
+_PAYMENTS_LOG_DRAIN_TIMEOUT = 10.0
+_payments_log_queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(maxsize=_PAYMENTS_LOG_QUEUE_MAX)
+
+def enqueue_payments_log(method: str, **kwargs: Any) -> None:
+    """מכניס לתור הודעת לוג (send_message) לקבוצת התשלומים – הודעות מידע בלבד"""
+    if not PAYMENTS_LOG_CHAT_ID:
+        return
+    try:
+        _payments_log_queue.put_nowait((method, kwargs))
+    except asyncio.QueueFull:
+        logger.warning("Payments log queue full, dropping %s", method)
+
+async def _payments_log_worker() -> None:
+    while True:
+        method, kwargs = await _payments_log_queue.get()
+        try:
+            await getattr(ptb_app.bot, method)(chat_id=PAYMENTS_LOG_CHAT_ID, **kwargs)
+        except Exception as e:
+            logger.error("Failed to send %s to payments group: %s", method, e)
+        finally:
+            _payments_log_queue.task_done()
+        await asyncio.sleep(_PAYMENTS_LOG_INTERVAL)
+
+# הבוט מטפל רק בהודעות ו-callback queries – לא מבקשים מטלגרם סוגי עדכונים אחרים
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
 # =========================
 # FastAPI + lifespan
 # =========================
@@ -353,7 +498,7 @@ async def lifespan(app: FastAPI):
     logger.info("Setting Telegram webhook to %s", WEBHOOK_URL)
     try:
         # snake_case API name – עובד בגרסאות החדשות
-        await ptb_app.bot.set_webhook(url=WEBHOOK_URL, allowed_updates=Update.ALL_TYPES)
+        await ptb_app.bot.set_webhook(url=WEBHOOK_URL, allowed_updates=ALLOWED_UPDATES)
         logger.info("Webhook set successfully")
     except Exception as e:
         logger.error("Failed to set webhook on Telegram: %s", e)
@@ -369,42 +514,43 @@ async def lifespan(app: FastAPI):
     async with ptb_app:
         logger.info("Starting Telegram Application (ptb_app)")
         await ptb_app.start()
+        log_worker = asyncio.create_task(_payments_log_worker())
         yield
         logger.info("Stopping Telegram Application (ptb_app)")
+        # מרוקנים את תור הלוגים לפני העצירה – הודעות שנשארו בתור לא נזרקות בשקט
+        try:
+            await asyncio.wait_for(_payments_log_queue.join(), timeout=_PAYMENTS_LOG_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Payments log queue not drained on shutdown, %d messages left",
+                _payments_log_queue.qsize(),
+            )
+        log_worker.cancel()
         await ptb_app.stop()
+    if DB_AVAILABLE:
+        close_pool()
 
 app = FastAPI(lifespan=lifespan)
 
 # =========================
 # Routers נוספים (אופציונלי)
 # =========================
-public_router = None
-social_router = None
-core_router = None
-
-try:
-    from slh_public_api import router as public_router  # type: ignore
-except Exception as e:
-    logger.info("Public API router (slh_public_api) not loaded: %s", e)
-
-try:
-    from social_api import router as social_router  # type: ignore
-except Exception as e:
-    logger.info("Social API router (social_api) not loaded: %s", e)
-
-try:
-    from slh_core_api import router as core_router  # type: ignore
-except Exception as e:
-    logger.info("Core referral API router (slh_core_api) not loaded: %s", e)
-
-if public_router is not None:
-    app.include_router(public_router, prefix="/api/public", tags=["public"])
-
-if social_router is not None:
-    app.include_router(social_router, prefix="/api/social", tags=["social"])
-
-if core_router is not None:
-    app.include_router(core_router, prefix="/api/core", tags=["core"])
+_ROUTER_SPECS = [
+    ("slh_public_api", "/api/public", "public"),
+    ("social_api", "/api/social", "social"),
+    ("slh_core_api", "/api/core", "core"),
+]
+
+for _mod_name, _prefix, _tag in _ROUTER_SPECS:
+    # find_spec לא מריץ את המודול – מדלגים בזול על מודולים שלא קיימים
+    if importlib.util.find_spec(_mod_name) is None:
+        logger.info("%s router not found, skipping", _mod_name)
+        continue
+    try:
+        _mod = importlib.import_module(_mod_name)
+        app.include_router(_mod.router, prefix=_prefix, tags=[_tag])
+    except Exception as e:
+        logger.info("%s router not loaded: %s", _mod_name, e)
 
 # =========================
 # מקלדת יציבה (Reply Keyboard)
@@ -413,38 +559,75 @@ def get_stable_keyboard(lang: str = 'he') -> ReplyKeyboardMarkup:
     """מחזיר מקלדת יציבה עם כפתורים קבועים"""
     keyboard = [
         [
-            KeyboardButton(trans_manager.get_text("join_community", lang)),
-            KeyboardButton(trans_manager.get_text("digital_asset_info", lang))
+            KeyboardButton(get_text("join_community", lang)),
+            KeyboardButton(get_text("digital_asset_info", lang))
         ],
         [
-            KeyboardButton(trans_manager.get_text("share_gateway", lang)),
-            KeyboardButton(trans_manager.get_text("slh_vision", lang))
+            KeyboardButton(get_text("share_gateway", lang)),
+            KeyboardButton(get_text("slh_vision", lang))
         ],
         [
-            KeyboardButton(trans_manager.get_text("my_area", lang)),
-            KeyboardButton(trans_manager.get_text("support", lang))
+            KeyboardButton(get_text("my_area", lang)),
+            KeyboardButton(get_text("support", lang))
         ]
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, persistent=True)
 
+# נבנית מראש לכל שפה נתמכת – ה-handlers ניגשים ישירות ל-dict
+_STABLE_KB: Dict[str, ReplyKeyboardMarkup] = {l: get_stable_keyboard(l) for l in _LANGS}
+
 # =========================
 # API Routes for Website
 # =========================
 
+# דף הנחיתה נבדק פעם אחת בעליית השרת ולא בכל בקשה
+_INDEX_FILE_RESPONSE_PATH = "docs/index.html"
+_INDEX_EXISTS = os.path.exists(_INDEX_FILE_RESPONSE_PATH)
+_FALLBACK_HTML_RESPONSE = HTMLResponse(
+    "<html><body><h1>SLH / Buy My Shop</h1><p>Landing page is missing (docs/index.html).</p></body></html>"
+)
+
+if _INDEX_EXISTS:
+    # דף סטטי וקטן – נקרא לזיכרון פעם אחת ומוגש ישירות מה-bytes
+    with open(_INDEX_FILE_RESPONSE_PATH, "rb") as f:
+        _INDEX_BYTES = f.read()
+    _INDEX_RESP = Response(content=_INDEX_BYTES, media_type="text/html")
+else:
+    logger.warning("docs/index.html not found, serving simple HTML fallback")
+    _INDEX_RESP = _FALLBACK_HTML_RESPONSE
+
+def _site_response() -> Response:
+    return _INDEX_RESP
+
 @app.get("/")
 async def serve_site():
     """מגיש את אתר האינטרנט"""
-    if not os.path.exists("docs/index.html"):
-        logger.warning("docs/index.html not found, returning simple HTML fallback")
-        return HTMLResponse(
-            "<html><body><h1>SLH / Buy My Shop</h1><p>Landing page is missing (docs/index.html).</p></body></html>"
-        )
-    return FileResponse("docs/index.html")
+    return _site_response()
 
 @app.get("/site")
 async def serve_site_alt():
     """מגיש את אתר האינטרנט (alias)"""
-    return await serve_site()
+    return _site_response()
+
+# מטמון קצר-טווח וחסום של JSON מוכן (bytes) לפי limit – פולינג של דף הנחיתה
+# לא פוגע ב-DB ולא מקודד JSON מחדש בכל בקשה.
+# limit מגיע מהלקוח – מוגבל לטווח 1..100, כך שהמטמון לא גדל ללא גבול
+_LIST_CACHE_TTL = 5.0
+_LIST_LIMIT_MAX = 100
+_POSTS_CACHE: TTLCache = TTLCache(maxsize=_LIST_LIMIT_MAX, ttl=_LIST_CACHE_TTL)
+_SALES_CACHE: TTLCache = TTLCache(maxsize=_LIST_LIMIT_MAX, ttl=_LIST_CACHE_TTL)
+
+async def _cached_items_response(
+    cache: TTLCache,
+    limit: int,
+    fetch: Callable[[int], List[Dict[str, Any]]],
+) -> Response:
+    limit = max(1, min(limit, _LIST_LIMIT_MAX))
+    body = cache.get(limit)
+    if body is None:
+        body = orjson.dumps({"items": await asyncio.to_thread(fetch, limit)})
+        cache[limit] = body
+    return Response(content=body, media_type="application/json")
 
 @app.get("/api/posts")
 async def get_posts(limit: int = 20):
@@ -454,8 +637,7 @@ async def get_posts(limit: int = 20):
     
     try:
         from db import get_social_posts
-        posts = get_social_posts(limit)
-        return {"items": posts}
+        return await _cached_items_response(_POSTS_CACHE, limit, get_social_posts)
     except Exception as e:
         logger.error("Failed to get posts: %s", e)
         return {"items": []}
@@ -468,31 +650,40 @@ async def get_token_sales(limit: int = 50):
     
     try:
         from db import get_token_sales
-        sales = get_token_sales(limit)
-        return {"items": sales}
+        return await _cached_items_response(_SALES_CACHE, limit, get_token_sales)
     except Exception as e:
         logger.error("Failed to get token sales: %s", e)
         return {"items": []}
 
+# תשובת שער הטוקן נבנית מחדש לכל היותר פעם בשנייה (בגבול שנייה שלמה)
+_token_price_cache: Dict[str, Any] = {"expires": 0, "body": b""}
+
 @app.get("/api/token/price")
 async def get_token_price():
     """API לשער הטוקן"""
-    return {
-        "official_price_nis": 444,
-        "currency": "ILS",
-        "updated_at": datetime.utcnow().isoformat()
-    }
+    now = int(time.time())
+    if now >= _token_price_cache["expires"]:
+        _token_price_cache["body"] = orjson.dumps({
+            "official_price_nis": 444,
+            "currency": "ILS",
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+        })
+        _token_price_cache["expires"] = now + 1
+    return Response(content=_token_price_cache["body"], media_type="application/json")
+
+# ההגדרות הציבוריות נקראות מה-ENV פעם אחת בעליית השרת
+_PUBLIC_CONFIG_BODY = orjson.dumps({
+    "slh_nis": 39,
+    "business_group_link": os.environ.get("COMMUNITY_GROUP_LINK", "https://t.me/+HIzvM8sEgh1kNWY0"),
+    "paybox_url": os.environ.get("PAYBOX_URL"),
+    "bit_url": os.environ.get("BIT_URL"),
+    "paypal_url": os.environ.get("PAYPAL_URL")
+})
 
 @app.get("/config/public")
 async def get_public_config():
     """API להגדרות ציבוריות"""
-    return {
-        "slh_nis": 39,
-        "business_group_link": os.environ.get("COMMUNITY_GROUP_LINK", "https://t.me/+HIzvM8sEgh1kNWY0"),
-        "paybox_url": os.environ.get("PAYBOX_URL"),
-        "bit_url": os.environ.get("BIT_URL"),
-        "paypal_url": os.environ.get("PAYPAL_URL")
-    }
+    return Response(content=_PUBLIC_CONFIG_BODY, media_type="application/json")
 
 @app.get("/admin/dashboard")
 async def admin_dashboard(token: str = ""):
@@ -548,7 +739,8 @@ async def handle_telegram_login(user_data: dict):
         if DB_AVAILABLE:
             try:
                 from db import store_user
-                store_user(
+                await asyncio.to_thread(
+                    store_user,
                     user_id=user_data['id'],
                     username=user_data.get('username'),
                     first_name=user_data.get('first_name'),
@@ -564,13 +756,17 @@ async def handle_telegram_login(user_data: dict):
         }
         
     except Exception as e:
-        logger.error(f"Telegram login error: {e}")
+        logger.error("Telegram login error: %s", e)
         return {"status": "error", "message": str(e)}
 
 # =========================
 # Routes – Webhook + Health + Admin Stats API
 # =========================
 
+_HTTP_OK = HTTPStatus.OK.value
+# תגובה ריקה ללא state – בטוח לשימוש חוזר בין בקשות
+_EMPTY_OK_RESPONSE = Response(status_code=_HTTP_OK)
+
 @app.post("/webhook")
 async def telegram_webhook(request: Request) -> Response:
     """נקודת ה-webhook שטלגרם קורא אליה"""
@@ -588,7 +784,7 @@ async def telegram_webhook(request: Request) -> Response:
 
     if is_duplicate_update(update):
         logger.warning("Duplicate update_id=%s – ignoring", update.update_id)
-        return Response(status_code=HTTPStatus.OK.value)
+        return _EMPTY_OK_RESPONSE
 
     try:
         await ptb_app.process_update(update)
@@ -599,7 +795,7 @@ async def telegram_webhook(request: Request) -> Response:
         logger.exception("Unhandled error in process_update: %s", e)
         raise HTTPException(status_code=500, detail="Internal error during update processing")
 
-    return Response(status_code=HTTPStatus.OK.value)
+    return _EMPTY_OK_RESPONSE
 
 @app.get("/health")
 async def health():
@@ -624,9 +820,12 @@ async def admin_stats(token: str = ""):
         return {"db": "disabled"}
 
     try:
-        stats = get_approval_stats()
-        monthly = get_monthly_payments(datetime.utcnow().year, datetime.utcnow().month)
-        top_ref = get_top_referrers(5)
+        now = datetime.utcnow()
+        stats, monthly, top_ref = await asyncio.gather(
+            asyncio.to_thread(get_approval_stats),
+            asyncio.to_thread(get_monthly_payments, now.year, now.month),
+            asyncio.to_thread(get_top_referrers, 5),
+        )
     except Exception as e:
         logger.error("Failed to get admin stats: %s", e)
         raise HTTPException(status_code=500, detail="DB error")
@@ -641,42 +840,44 @@ async def admin_stats(token: str = ""):
 # =========================
 # עזרי UI (מקשים)
 # =========================
+# המקלדות סטטיות לכל שפה ואובייקטי telegram אינם ניתנים לשינוי,
+# לכן כל factory נקרא פעם אחת לשפה בטעינת המודול (ראו _MAIN_MENU_KB וכו').
 
 def main_menu_keyboard(lang: str = 'he') -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton(trans_manager.get_text("join_community", lang), callback_data="join"),
+            InlineKeyboardButton(get_text("join_community", lang), callback_data="join"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("digital_asset_info", lang), callback_data="digital_asset_info"),
+            InlineKeyboardButton(get_text("digital_asset_info", lang), callback_data="digital_asset_info"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("share_gateway", lang), callback_data="share"),
+            InlineKeyboardButton(get_text("share_gateway", lang), callback_data="share"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("slh_vision", lang), callback_data="vision"),
+            InlineKeyboardButton(get_text("slh_vision", lang), callback_data="vision"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("my_area", lang), callback_data="my_area"),
+            InlineKeyboardButton(get_text("my_area", lang), callback_data="my_area"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("support", lang), callback_data="support"),
+            InlineKeyboardButton(get_text("support", lang), callback_data="support"),
         ],
     ])
 
 def payment_methods_keyboard(lang: str = 'he') -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton(trans_manager.get_text("bank_transfer", lang), callback_data="pay_bank"),
+            InlineKeyboardButton(get_text("bank_transfer", lang), callback_data="pay_bank"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("bit_paybox", lang), callback_data="pay_paybox"),
+            InlineKeyboardButton(get_text("bit_paybox", lang), callback_data="pay_paybox"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("ton_payment", lang), callback_data="pay_ton"),
+            InlineKeyboardButton(get_text("ton_payment", lang), callback_data="pay_ton"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("back", lang), callback_data="back_main"),
+            InlineKeyboardButton(get_text("back", lang), callback_data="back_main"),
         ],
     ])
 
@@ -685,7 +886,7 @@ def payment_links_keyboard(lang: str = 'he') -> InlineKeyboardMarkup:
         [InlineKeyboardButton("📲 תשלום בפייבוקס", url=PAYBOX_URL)],
         [InlineKeyboardButton("📲 תשלום בביט", url=BIT_URL)],
         [InlineKeyboardButton("💳 תשלום ב-PayPal", url=PAYPAL_URL)],
-        [InlineKeyboardButton(trans_manager.get_text("back", lang), callback_data="back_main")],
+        [InlineKeyboardButton(get_text("back", lang), callback_data="back_main")],
     ]
     return InlineKeyboardMarkup(buttons)
 
@@ -701,7 +902,7 @@ def my_area_keyboard(lang: str = 'he') -> InlineKeyboardMarkup:
             InlineKeyboardButton("📊 הצג נכס דיגיטלי", callback_data="show_asset"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("back", lang), callback_data="back_main"),
+            InlineKeyboardButton(get_text("back", lang), callback_data="back_main"),
         ],
     ])
 
@@ -714,15 +915,15 @@ def support_keyboard(lang: str = 'he') -> InlineKeyboardMarkup:
             InlineKeyboardButton("פניה למתכנת", url=f"tg://user?id={DEVELOPER_USER_ID}"),
         ],
         [
-            InlineKeyboardButton(trans_manager.get_text("back", lang), callback_data="back_main"),
+            InlineKeyboardButton(get_text("back", lang), callback_data="back_main"),
         ],
     ])
 
 def admin_approval_keyboard(user_id: int, lang: str = 'he') -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton(trans_manager.get_text("approve", lang), callback_data=f"adm_approve:{user_id}"),
-            InlineKeyboardButton(trans_manager.get_text("reject", lang), callback_data=f"adm_reject:{user_id}"),
+            InlineKeyboardButton(get_text("approve", lang), callback_data=f"adm_approve:{user_id}"),
+            InlineKeyboardButton(get_text("reject", lang), callback_data=f"adm_reject:{user_id}"),
         ],
     ])
 
@@ -738,604 +939,1189 @@ def language_keyboard() -> InlineKeyboardMarkup:
         ]
     ])
 
+# מקלדות בנויות מראש לכל שפה נתמכת (השפה תמיד מנורמלת ע"י normalize_lang)
+_MAIN_MENU_KB: Dict[str, InlineKeyboardMarkup] = {l: main_menu_keyboard(l) for l in _LANGS}
+_PAY_METHODS_KB: Dict[str, InlineKeyboardMarkup] = {l: payment_methods_keyboard(l) for l in _LANGS}
+_PAY_LINKS_KB: Dict[str, InlineKeyboardMarkup] = {l: payment_links_keyboard(l) for l in _LANGS}
+_MY_AREA_KB: Dict[str, InlineKeyboardMarkup] = {l: my_area_keyboard(l) for l in _LANGS}
+_SUPPORT_KB: Dict[str, InlineKeyboardMarkup] = {l: support_keyboard(l) for l in _LANGS}
+_LANGUAGE_KB: InlineKeyboardMarkup = language_keyboard()
+
+# =========================
+# טקסטים קבועים להודעות (נבנים פעם אחת בטעינת המודול)
+# =========================
+
+_WELCOME_TEXT: Dict[str, str] = {
+    'he': (
+        "🎉 *ברוך הבא לנכס הדיגיטלי המניב שלך!*\n\n"
+        
+        "💎 *מה זה הנכס הדיגיטלי?*\n"
+        "זהו שער כניסה אישי לקהילת עסקים פעילה. לאחר רכישה תקבל:\n"
+        "• לינק אישי להפצה\n"
+        "• אפשרות למכור את הנכס הלאה\n"
+        "• גישה לקבוצת משחק כללית\n"
+        "• מערכת הפניות מתגמלת\n\n"
+        
+        "🔄 *איך זה עובד?*\n"
+        "1. רוכשים נכס ב-39₪\n"
+        "2. מקבלים לינק אישי\n"
+        "3. מפיצים - כל רכישה דרך הלינק שלך מתועדת\n"
+        "4. מרוויחים מהפצות נוספות\n\n"
+        
+        "🚀 *מה תקבל?*\n"
+        "✅ גישה לקהילת עסקים\n"
+        "✅ נכס דיגיטלי אישי\n"
+        "✅ לינק הפצה ייחודי\n"
+        "✅ אפשרות מכירה חוזרת\n"
+        "✅ מערכת הפניות שקופה\n\n"
+        
+        "💼 *הנכס שלך - העסק שלך!*"
+    ),
+    'en': (
+        "🎉 *Welcome to your profitable digital asset!*\n\n"
+        
+        "💎 *What is the Digital Asset?*\n"
+        "This is a personal gateway to an active business community. After purchase you get:\n"
+        "• Personal sharing link\n"
+        "• Ability to resell the asset\n"
+        "• Access to general community group\n"
+        "• Rewarding referral system\n\n"
+        
+        "🔄 *How it works?*\n"
+        "1. Buy an asset for 39₪\n"
+        "2. Get personal link\n"
+        "3. Share - every purchase through your link is recorded\n"
+        "4. Earn from additional referrals\n\n"
+        
+        "🚀 *What you get?*\n"
+        "✅ Access to business community\n"
+        "✅ Personal digital asset\n"
+        "✅ Unique sharing link\n"
+        "✅ Resale option\n"
+        "✅ Transparent referral system\n\n"
+        
+        "💼 *Your Asset - Your Business!*"
+    ),
+    'ru': (
+        "🎉 *Добро пожаловать в ваш прибыльный цифровой актив!*\n\n"
+        
+        "💎 *Что такое цифровой актив?*\n"
+        "Это персональный вход в активное бизнес-сообщество. После покупки вы получаете:\n"
+        "• Персональную ссылку для распространения\n"
+        "• Возможность перепродажи актива\n"
+        "• Доступ к общей группе сообщества\n"
+        "• Вознаграждающую реферальную систему\n\n"
+        
+        "🔄 *Как это работает?*\n"
+        "1. Покупаете актив за 39₪\n"
+        "2. Получаете персональную ссылку\n"
+        "3. Распространяете - каждая покупка по вашей ссылке записывается\n"
+        "4. Зарабатываете на дополнительных рефералах\n\n"
+        
+        "🚀 *Что вы получаете?*\n"
+        "✅ Доступ к бизнес-сообществу\n"
+        "✅ Персональный цифровой актив\n"
+        "✅ Уникальную ссылку для распространения\n"
+        "✅ Опцию перепродажи\n"
+        "✅ Прозрачную реферальную систему\n\n"
+        
+        "💼 *Ваш актив - Ваш бизнес!*"
+    ),
+    'ar': (
+        "🎉 *مرحبًا بك في أصولك الرقمية المربحة!*\n\n"
+        
+        "💎 *ما هي الأصول الرقمية؟*\n"
+        "هذا هو المدخل الشخصي لمجتمع الأعمال النشط. بعد الشراء تحصل على:\n"
+        "• رابط مشاركة شخصي\n"
+        "• إمكانية إعادة بيع الأصل\n"
+        "• الوصول إلى مجموعة المجتمع العامة\n"
+        "• نظام إحالة مجزي\n\n"
+        
+        "🔄 *كيف يعمل؟*\n"
+        "1. شراء أصل بـ 39₪\n"
+        "2. الحصول على رابط شخصي\n"
+        "3. شارك - يتم تسجيل كل عملية شراء من خلال رابطك\n"
+        "4. اربح من الإحالات الإضافية\n\n"
+        
+        "🚀 *ماذا تحصل؟*\n"
+        "✅ الوصول إلى مجتمع الأعمال\n"
+        "✅ الأصول الرقمية الشخصية\n"
+        "✅ رابط مشاركة فريد\n"
+        "✅ خيار إعادة البيع\n"
+        "✅ نظام إحالة شفاف\n\n"
+        
+        "💼 *أصولك - عملك!*"
+    )
+}
+
+_WELCOME_LANG_PROMPT: Dict[str, str] = {
+    'he': "🌐 *בחר שפה / Choose language*",
+    'en': "🌐 *Choose language / اختر اللغة*",
+    'ru': "🌐 *Выберите язык / اختر اللغة*",
+    'ar': "🌐 *اختر اللغة / Choose language*"
+}
+
+_MD_ENTITY_TYPES: Dict[str, str] = {
+    '*': MessageEntity.BOLD,
+    '_': MessageEntity.ITALIC,
+    '`': MessageEntity.CODE,
+}
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode('utf-16-le')) // 2
+
+def _markdown_to_entities(text: str) -> Tuple[str, Tuple[MessageEntity, ...]]:
+    """
+    ממיר טקסט Markdown (legacy) לטקסט נקי + entities.
+    תומך ב-*bold*, _italic_, `code` – מספיק לטקסטים הקבועים של הבוט.
+    ה-offsets נמדדים ביחידות UTF-16 כפי שטלגרם דורש.
+    """
+    out: List[str] = []
+    entities: List[MessageEntity] = []
+    pos = 0  # אורך UTF-16 של מה שנכתב עד כה
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        end = text.find(ch, i + 1) if ch in _MD_ENTITY_TYPES else -1
+        if end == -1:
+            out.append(ch)
+            pos += _utf16_len(ch)
+            i += 1
+            continue
+        inner = text[i + 1:end]
+        length = _utf16_len(inner)
+        entities.append(MessageEntity(type=_MD_ENTITY_TYPES[ch], offset=pos, length=length))
+        out.append(inner)
+        pos += length
+        i = end + 1
+    return "".join(out), tuple(entities)
+
+# הודעת הפתיחה מפוענחת פעם אחת – נשלחת כטקסט + entities בלי parse_mode
+_WELCOME_RENDERED: Dict[Tuple[str, bool], Tuple[str, Tuple[MessageEntity, ...]]] = {}
+for _lang, _text in _WELCOME_TEXT.items():
+    _WELCOME_RENDERED[(_lang, False)] = _markdown_to_entities(_text)
+    _WELCOME_RENDERED[(_lang, True)] = _markdown_to_entities(
+        f"{_text}\n\n{_WELCOME_LANG_PROMPT.get(_lang, _WELCOME_LANG_PROMPT['he'])}"
+    )
+del _lang, _text
+
+_ASSET_INFO_TEXT: Dict[str, str] = {
+    'he': (
+        "💎 *הנכס הדיגיטלי - ההזדמנות העסקית שלך!*\n\n"
+        
+        "🏗 *מה זה בעצם?*\n"
+        "נכס דיגיטלי הוא 'שער כניסה' אישי שאתה קונה פעם אחת ב-39₪ ומקבל:\n"
+        "• לינק אישי משלך\n"
+        "• זכות למכור נכסים נוספים\n"
+        "• גישה למערכת שלמה\n\n"
+        
+        "💸 *איך מרוויחים?*\n"
+        "1. אתה רוכש נכס ב-39₪\n"
+        "2. מקבל לינק אישי להפצה\n"
+        "3 *כל אדם* שקונה דרך הלינק שלך - הרכישה מתועדת לזכותך\n"
+        "4. הנכס שלך ממשיך להניב הכנסות\n\n"
+        
+        "🔄 *מודל מכירה חוזרת:*\n"
+        "אתה לא רק 'משתמש' - אתה 'בעל נכס'!\n"
+        "יכול למכור נכסים נוספים לאחרים\n"
+        "כל רכישה נוספת מתועדת בשרשרת ההפניה\n\n"
+        
+        "📈 *יתרונות:*\n"
+        "• הכנסה פסיבית מהפצות\n"
+        "• נכס ששווה יותר עם הזמן\n"
+        "• קהילה תומכת\n"
+        "• שקיפות מלאה\n\n"
+        
+        "🎯 *המטרה:* ליצור רשת עסקית שבה כולם מרוויחים!"
+    ),
+    'en': (
+        "💎 *The Digital Asset - Your Business Opportunity!*\n\n"
+        
+        "🏗 *What is it actually?*\n"
+        "A digital asset is a personal 'gateway' that you buy once for 39₪ and get:\n"
+        "• Your personal link\n"
+        "• Right to sell additional assets\n"
+        "• Access to complete system\n\n"
+        
+        "💸 *How to earn?*\n"
+        "1. You buy an asset for 39₪\n"
+        "2. Get personal sharing link\n"
+        "3 *Every person* who buys through your link - purchase recorded to your credit\n"
+        "4. Your asset continues to generate income\n\n"
+        
+        "🔄 *Resale model:*\n"
+        "You're not just a 'user' - you're an 'asset owner'!\n"
+        "Can sell additional assets to others\n"
+        "Every additional purchase is recorded in referral chain\n\n"
+        
+        "📈 *Advantages:*\n"
+        "• Passive income from sharing\n"
+        "• Asset that gains value over time\n"
+        "• Supportive community\n"
+        "• Full transparency\n\n"
+        
+        "🎯 *The goal:* Create business network where everyone wins!"
+    ),
+    'ru': (
+        "💎 *Цифровой актив - Ваша бизнес-возможность!*\n\n"
+        
+        "🏗 *Что это на самом деле?*\n"
+        "Цифровой актив - это персональный 'вход', который вы покупаете один раз за 39₪ и получаете:\n"
+        "• Вашу персональную ссылку\n"
+        "• Право продавать дополнительные активы\n"
+        "• Доступ к полной системе\n\n"
+        
+        "💸 *Как заработать?*\n"
+        "1. Вы покупаете актив за 39₪\n"
+        "2. Получаете персональную ссылку для распространения\n"
+        "3 *Каждый человек*, который покупает по вашей ссылке - покупка записывается в ваш зачет\n"
+        "4. Ваш актив продолжает генерировать доход\n\n"
+        
+        "🔄 *Модель перепродажи:*\n"
+        "Вы не просто 'пользователь' - вы 'владелец актива'!\n"
+        "Можете продавать дополнительные активы другим\n"
+        "Каждая дополнительная покупка записывается в реферальную цепочку\n\n"
+        
+        "📈 *Преимущества:*\n"
+        "• Пассивный доход от распространения\n"
+        "• Актив, который со временем растет в цене\n"
+        "• Поддерживающее сообщество\n"
+        "• Полная прозрачность\n\n"
+        
+        "🎯 *Цель:* Создать бизнес-сеть, где выигрывают все!"
+    ),
+    'ar': (
+        "💎 *الأصول الرقمية - فرصة عملك!*\n\n"
+        
+        "🏗 *ما هو في الواقع؟*\n"
+        "الأصل الرقمي هو 'بوابة' شخصية تشتريها مرة واحدة بـ 39₪ وتحصل على:\n"
+        "• رابطك الشخصي\n"
+        "• الحق في بيع أصول إضافية\n"
+        "• الوصول إلى النظام الكامل\n\n"
+        
+        "💸 *كيف تربح؟*\n"
+        "1. تشتري أصلًا بـ 39₪\n"
+        "2. تحصل على رابط مشاركة شخصي\n"
+        "3 *كل شخص* يشتري من خلال رابطك - يتم تسجيل الشراء لرصيدك\n"
+        "4. أصولك تستمر في تحقيق الدخل\n\n"
+        
+        "🔄 *نموذج إعادة البيع:*\n"
+        "أنت لست مجرد 'مستخدم' - أنت 'مالك أصول'!\n"
+        "يمكنك بيع أصول إضافية للآخرين\n"
+        "يتم تسجيل كل عملية شراء إضافية في سلسلة الإحالة\n\n"
+        
+        "📈 *مزايا:*\n"
+        "• دخل سلبي من المشاركة\n"
+        "• أصول تزداد قيمة مع الوقت\n"
+        "• مجتمع داعم\n"
+        "• شفافية كاملة\n\n"
+        
+        "🎯 *الهدف:* إنشاء شبكة أعمال حيث يربح الجميع!"
+    )
+}
+
+_JOIN_TEXT: Dict[str, str] = {
+    'he': (
+        "🔑 *רכישת הנכס הדיגיטלי - 39₪*\n\n"
+        "בתמורה ל-39₪ תקבל:\n"
+        "• נכס דיגיטלי אישי\n"
+        "• לינק הפצה ייחודי\n"
+        "• גישה לקהילת עסקים\n"
+        "• אפשרות למכור נכסים נוספים\n\n"
+        
+        "🔄 *איך התהליך עובד?*\n"
+        "1. בוחרים אמצעי תשלום\n"
+        "2. משלמים 39₪\n"
+        "3. שולחים אישור תשלום\n"
+        "4. מקבלים אישור + לינק אישי\n"
+        "5. מתחילים להפיץ!\n\n"
+        
+        "💼 *זכור:* אתה קונה *נכס* - לא רק 'גישה'!"
+    ),
+    'en': (
+        "🔑 *Digital Asset Purchase - 39₪*\n\n"
+        "In return for 39₪ you get:\n"
+        "• Personal digital asset\n"
+        "• Unique sharing link\n"
+        "• Access to business community\n"
+        "• Ability to sell additional assets\n\n"
+        
+        "🔄 *How the process works?*\n"
+        "1. Choose payment method\n"
+        "2. Pay 39₪\n"
+        "3. Send payment confirmation\n"
+        "4. Get approval + personal link\n"
+        "5. Start sharing!\n\n"
+        
+        "💼 *Remember:* You're buying an *asset* - not just 'access'!"
+    ),
+    'ru': (
+        "🔑 *Покупка цифрового актива - 39₪*\n\n"
+        "Взамен на 39₪ вы получаете:\n"
+        "• Персональный цифровой актив\n"
+        "• Уникальную ссылку для распространения\n"
+        "• Доступ к бизнес-сообществу\n"
+        "• Возможность продавать дополнительные активы\n\n"
+        
+        "🔄 *Как работает процесс?*\n"
+        "1. Выбираете способ оплаты\n"
+        "2. Платите 39₪\n"
+        "3. Отправляете подтверждение оплаты\n"
+        "4. Получаете одобрение + персональную ссылку\n"
+        "5. Начинаете распространять!\n\n"
+        
+        "💼 *Помните:* Вы покупаете *актив* - не просто 'доступ'!"
+    ),
+    'ar': (
+        "🔑 *شراء الأصول الرقمية - 39₪*\n\n"
+        "في مقابل 39₪ تحصل على:\n"
+        "• الأصول الرقمية الشخصية\n"
+        "• رابط مشاركة فريد\n"
+        "• الوصول إلى مجتمع الأعمال\n"
+        "• القدرة على بيع أصول إضافية\n\n"
+        
+        "🔄 *كيف تعمل العملية؟*\n"
+        "1. اختر طريقة الدفع\n"
+        "2. ادفع 39₪\n"
+        "3. أرسل تأكيد الدفع\n"
+        "4. احصل على الموافقة + الرابط الشخصي\n"
+        "5. ابدأ المشاركة!\n\n"
+        "💼 *تذكر:* أنت تشتري *أصولًا* - ليس مجرد 'وصول'!"
+    )
+}
+
+_PAY_INSTRUCTIONS_TEXT: Dict[str, str] = {
+    'he': (
+        "{method_text}\n\n"
+        "💎 *לאחר התשלום:*\n"
+        "1. שלח צילום מסך של האישור\n"
+        "2. נאשר בתוך זמן קצר\n"
+        "3. תקבל את הנכס הדיגיטלי שלך\n"
+        "4. תוכל להתחיל להפיץ ולהרוויח!\n\n"
+        "*זכור:* אתה רוכש *נכס* - לא רק גישה!"
+    ),
+    'en': (
+        "{method_text}\n\n"
+        "💎 *After payment:*\n"
+        "1. Send screenshot of confirmation\n"
+        "2. We'll approve shortly\n"
+        "3. You'll receive your digital asset\n"
+        "4. You can start sharing and earning!\n\n"
+        "*Remember:* You're buying an *asset* - not just access!"
+    ),
+    'ru': (
+        "{method_text}\n\n"
+        "💎 *После оплаты:*\n"
+        "1. Отправьте скриншот подтверждения\n"
+        "2. Мы одобрим в ближайшее время\n"
+        "3. Вы получите ваш цифровой актив\n"
+        "4. Вы можете начать распространять и зарабатывать!\n\n"
+        "*Помните:* Вы покупаете *актив* - не просто доступ!"
+    ),
+    'ar': (
+        "{method_text}\n\n"
+        "💎 *بعد الدفع:*\n"
+        "1. أرسل لقطة شاشة للتأكيد\n"
+        "2. سنوافق قريبًا\n"
+        "3. سوف تتلقى أصولك الرقمية\n"
+        "4. يمكنك البدء في المشاركة والربح!\n\n"
+        "*تذكر:* أنت تشتري *أصولًا* - ليس مجرد وصول!"
+    )
+}
+
+# callback_data -> (מפתח שיטת התשלום, כותרת הוראות התשלום)
+_PAY_METHODS: Dict[str, Tuple[str, str]] = {
+    "pay_bank": ("bank", BANK_DETAILS),
+    "pay_paybox": ("paybox", "📲 *תשלום בביט / פייבוקס / PayPal*"),
+    "pay_ton": ("ton", "💎 *תשלום ב-TON*"),
+}
+_PAY_METHOD_UNKNOWN: Tuple[str, str] = ("unknown", "")
+
+_PAY_METHOD_LABELS: Dict[str, str] = {
+    "bank": "העברה בנקאית",
+    "paybox": "ביט / פייבוקס / PayPal",
+    "ton": "טלגרם (TON)",
+    "unknown": "לא ידוע",
+}
+
+_PAY_CONFIRM_TEXT: Dict[str, str] = {
+    'he': (
+        "✅ *אישור התשלום התקבל!*\n\n"
+        "האישור נשלח לצוות שלנו לאימות.\n"
+        "תקבל הודעה עם הנכס הדיגיטלי שלך בתוך זמן קצר.\n\n"
+        "💎 *מה תקבל לאחר אישור:*\n"
+        "• לינק אישי להפצה\n"
+        "• גישה לקהילה\n"
+        "• אפשרות למכור נכסים נוספים"
+    ),
+    'en': (
+        "✅ *Payment Confirmation Received!*\n\n"
+        "The confirmation has been sent to our team for verification.\n"
+        "You will receive your digital asset shortly.\n\n"
+        "💎 *What you get after approval:*\n"
+        "• Personal sharing link\n"
+        "• Community access\n"
+        "• Ability to sell additional assets"
+    ),
+    'ru': (
+        "✅ *Подтверждение оплаты получено!*\n\n"
+        "Подтверждение отправлено нашей команде для проверки.\n"
+        "Вы получите ваш цифровой актив в ближайшее время.\n\n"
+        "💎 *Что вы получите после одобрения:*\n"
+        "• Персональная ссылка для распространения\n"
+        "• Доступ к сообществу\n"
+        "• Возможность продавать дополнительные активы"
+    ),
+    'ar': (
+        "✅ *تم استلام تأكيد الدفع!*\n\n"
+        "تم إرسال التأكيد إلى فريقنا للتحقق.\n"
+        "ستستلم أصولك الرقمية قريبًا.\n\n"
+        "💎 *ما الذي تحصل عليه بعد الموافقة:*\n"
+        "• رابط مشاركة شخصي\n"
+        "• الوصول إلى المجتمع\n"
+        "• القدرة على بيع أصول إضافية"
+    )
+}
+
+# תבניות ההודעות לקבוצת הלוגים – החלקים הקבועים נבנים פעם אחת,
+# בכל עדכון רק format_map על השדות המשתנים
+_START_LOG_TMPL = "\n".join((
+    get_text('new_user_start', 'he'),
+    "",
+    "👤 user_id: `{user_id}`",
+    "📛 username: {username}",
+    "💬 chat_id: `{chat_id}`",
+    "📊 סטטוס: {status}",
+    "🕐 זמן: {ts}",
+    "",
+))
+
+_PAYMENT_LOG_TMPL = "\n".join((
+    get_text('payment_confirmation', 'he'),
+    "",
+    "👤 user_id: `{user_id}`",
+    "📛 username: {username}",
+    "💳 שיטת תשלום: {pay_method}",
+    "🕐 זמן: {ts}",
+    "",
+    f"*{get_text('admin_approval_notice', 'he')}*",
+))
+
+def _fmt_username(u: User) -> str:
+    return f"@{u.username}" if u.username else "(ללא username)"
+
+_APPROVAL_TEXT: Dict[str, str] = {
+    'he': (
+        "🎉 *התשלום אושר! ברוך הבא לבעלי הנכסים!*\n\n"
+        
+        "💎 *הנכס הדיגיטלי שלך מוכן:*\n"
+        "🔗 *לינק אישי:* `{personal_link}`\n\n"
+        
+        "🚀 *מה עכשיו?*\n"
+        "1. שתף את הלינק עם אחרים\n"
+        "2. כל רכישה דרך הלינק שלך מתועדת\n"
+        "3. תוכל למכור נכסים נוספים\n"
+        "4. צבור הכנסה מהפצות\n\n"
+        
+        "👥 *גישה לקהילה:*\n"
+        "{group_link}\n\n"
+        
+        "💼 *ניהול הנכס:*\n"
+        "השתמש בכפתור '👤 האזור האישי שלי'\n"
+        "כדי להגדיר פרטי בנק וקבוצות"
+    ),
+    'en': (
+        "🎉 *Payment Approved! Welcome Asset Owner!*\n\n"
+        
+        "💎 *Your digital asset is ready:*\n"
+        "🔗 *Personal link:* `{personal_link}`\n\n"
+        
+        "🚀 *What now?*\n"
+        "1. Share the link with others\n"
+        "2. Every purchase through your link is recorded\n"
+        "3. You can sell additional assets\n"
+        "4. Accumulate income from sharing\n\n"
+        
+        "👥 *Community access:*\n"
+        "{group_link}\n\n"
+        
+        "💼 *Asset management:*\n"
+        "Use the '👤 My Personal Area' button\n"
+        "to set bank details and groups"
+    ),
+    'ru': (
+        "🎉 *Оплата подтверждена! Добро пожаловать, владелец актива!*\n\n"
+        
+        "💎 *Ваш цифровой актив готов:*\n"
+        "🔗 *Персональная ссылка:* `{personal_link}`\n\n"
+        
+        "🚀 *Что теперь?*\n"
+        "1. Поделитесь ссылкой с другими\n"
+        "2. Каждая покупка по вашей ссылке записывается\n"
+        "3. Вы можете продавать дополнительные активы\n"
+        "4. Накопите доход от распространения\n\n"
+        "👥 *Доступ к сообществу:*\n"
+        "{group_link}\n\n"
+        
+        "💼 *Управление активом:*\n"
+        "Используйте кнопку '👤 Моя личная зона'\n"
+        "чтобы установить банковские реквизиты и группы"
+    ),
+    'ar': (
+        "🎉 *تمت الموافقة على الدفع! مرحبًا بك مالک الأصول!*\n\n"
+        
+        "💎 *أصولك الرقمية جاهزة:*\n"
+        "🔗 *رابط شخصي:* `{personal_link}`\n\n"
+        
+        "🚀 *ماذا الآن؟*\n"
+        "1. شارك الرابط مع الآخرين\n"
+        "2. يتم تسجيل كل عملية شراء من خلال رابطك\n"
+        "3. يمكنك بيع أصول إضافية\n"
+        "4. تراكم الدخل من المشاركة\n\n"
+        "👥 *الوصول إلى المجتمع:*\n"
+        "{group_link}\n\n"
+        
+        "💼 *إدارة الأصول:*\n"
+        "استخدم زر '👤 منطقتي الشخصية'\n"
+        "لتعيين تفاصيل البنك والمجموعات"
+    )
+}
+
+# לינק הקבוצה קבוע – מוצב פעם אחת; בזמן שליחה נשאר רק personal_link
+_APPROVAL_TMPL: Dict[str, str] = {
+    lang: text.replace("{group_link}", COMMUNITY_GROUP_LINK)
+    for lang, text in _APPROVAL_TEXT.items()
+}
+
+_APPROVAL_LOG_TMPL = "\n".join((
+    "✅ *אישור העברת תשלום* ✅",
+    "",
+    "👤 user_id: `{user_id}`",
+    "🕐 זמן אישור: {ts}",
+    "🔗 לינק אישי: `{personal_link}`",
+    "",
+    "*התשלום אושר והמשתמש קיבל את הנכס הדיגיטלי שלו*",
+))
+
+_LANG_SELECTED_TEXT: Dict[str, str] = {
+    'he': "✅ שפה נבחרה: עברית",
+    'en': "✅ Language selected: English", 
+    'ru': "✅ Язык выбран: Русский",
+    'ar': "✅ تم اختيار اللغة: العربية"
+}
+
+_MY_AREA_TEXT: Dict[str, str] = {
+    'he': (
+        "👤 *האזור האישי שלך*\n\n"
+        "🔗 *לינק אישי:*\n`{personal_link}`\n\n"
+        "🏦 *פרטי בנק:*\n{bank}\n\n"
+        "👥 *קבוצה אישית:*\n{p_group}\n\n"
+        "📊 *הפניות:* {total_ref}\n\n"
+        "*ניהול נכס:*"
+    ),
+    'en': (
+        "👤 *Your Personal Area*\n\n"
+        "🔗 *Personal link:*\n`{personal_link}`\n\n"
+        "🏦 *Bank details:*\n{bank}\n\n"
+        "👥 *Personal group:*\n{p_group}\n\n"
+        "📊 *Referrals:* {total_ref}\n\n"
+        "*Asset management:*"
+    ),
+    'ru': (
+        "👤 *Ваша личная зона*\n\n"
+        "🔗 *Персональная ссылка:*\n`{personal_link}`\n\n"
+        "🏦 *Банковские реквизиты:*\n{bank}\n\n"
+        "👥 *Персональная группа:*\n{p_group}\n\n"
+        "📊 *Рефералы:* {total_ref}\n\n"
+        "*Управление активом:*"
+    ),
+    'ar': (
+        "👤 *منطقتك الشخصية*\n\n"
+        "🔗 *رابط شخصي:*\n`{personal_link}`\n\n"
+        "🏦 *تفاصيل البنك:*\n{bank}\n\n"
+        "👥 *مجموعة شخصية:*\n{p_group}\n\n"
+        "📊 *الإحالات:* {total_ref}\n\n"
+        "*إدارة الأصول:*"
+    )
+}
+
+_MY_AREA_NO_ASSET_TEXT: Dict[str, str] = {
+    'he': (
+        "👤 *האזור האישי שלך*\n\n"
+        "עדיין אין לך נכס דיגיטלי.\n"
+        "רכש נכס כדי לקבל:\n"
+        "• לינק אישי להפצה\n"
+        "• אפשרות למכור נכסים\n"
+        "• גישה למערכת המלאה"
+    ),
+    'en': (
+        "👤 *Your Personal Area*\n\n"
+        "You don't have a digital asset yet.\n"
+        "Purchase an asset to get:\n"
+        "• Personal sharing link\n"
+        "• Ability to sell assets\n"
+        "• Access to full system"
+    ),
+    'ru': (
+        "👤 *Ваша личная зона*\n\n"
+        "У вас еще нет цифрового актива.\n"
+        "Приобретите актив, чтобы получить:\n"
+        "• Персональную ссылку для распространения\n"
+        "• Возможность продавать активы\n"
+        "• Доступ к полной системе"
+    ),
+    'ar': (
+        "👤 *منطقتك الشخصية*\n\n"
+        "ليس لديك أصول رقمية بعد.\n"
+        "شراء أصول للحصول على:\n"
+        "• رابط مشاركة شخصي\n"
+        "• القدرة على بيع الأصول\n"
+        "• الوصول إلى النظام الكامل"
+    )
+}
+
+_SYSTEM_UNAVAILABLE_TEXT: Dict[str, str] = {
+    'he': "מערכת הזמנית לא זמינה. נסה שוב מאוחר יותר.",
+    'en': "Temporary system unavailable. Try again later.",
+    'ru': "Временная система недоступна. Попробуйте позже.",
+    'ar': "النظام المؤقت غير متاح. حاول مرة أخرى لاحقًا."
+}
+
+_REJECTION_TEXT: Dict[str, str] = {
+    'he': (
+        "❌ *אישור התשלום נדחה*\n\n"
+        "*סיבה:* {reason}\n\n"
+        "אם לדעתך מדובר בטעות, פנה לתמיכה."
+    ),
+    'en': (
+        "❌ *Payment Approval Rejected*\n\n"
+        "*Reason:* {reason}\n\n"
+        "If you think this is a mistake, contact support."
+    ),
+    'ru': (
+        "❌ *Подтверждение оплаты отклонено*\n\n"
+        "*Причина:* {reason}\n\n"
+        "Если вы считаете, что это ошибка, обратитесь в поддержку."
+    ),
+    'ar': (
+        "❌ *تم رفض تأكيد الدفع*\n\n"
+        "*السبب:* {reason}\n\n"
+        "إذا كنت تعتقد أن هذا خطأ، اتصل بالدعم."
+    )
+}
+
+_SUPPORT_TEXT: Dict[str, str] = {
+    'he': (
+        "🆘 *תמיכה ועזרה*\n\n"
+        "בכל שלב אפשר לקבל עזרה באחד הערוצים הבאים:\n\n"
+        f"• קבוצת תמיכה: {SUPPORT_GROUP_LINK}\n"
+        f"• פניה ישירה למתכנת המערכת: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
+        "או חזור לתפריט הראשי:"
+    ),
+    'en': (
+        "🆘 *Support and Help*\n\n"
+        "At any stage you can get help in one of the following channels:\n\n"
+        f"• Support group: {SUPPORT_GROUP_LINK}\n"
+        f"• Direct contact with system developer: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
+        "Or return to main menu:"
+    ),
+    'ru': (
+        "🆘 *Поддержка и помощь*\n\n"
+        "На любом этапе вы можете получить помощь в одном из следующих каналов:\n\n"
+        f"• Группа поддержки: {SUPPORT_GROUP_LINK}\n"
+        f"• Прямой контакт с разработчиком системы: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
+        "Или вернуться в главное меню:"
+    ),
+    'ar': (
+        "🆘 *الدعم والمساعدة*\n\n"
+        "في أي مرحلة يمكنك الحصول على المساعدة في إحدى القنوات التالية:\n\n"
+        f"• مجموعة الدعم: {SUPPORT_GROUP_LINK}\n"
+        f"• الاتصال المباشر مع مطور النظام: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
+        "أو العودة إلى القائمة الرئيسية:"
+    )
+}
+
+_SHARE_TEXT: Dict[str, str] = {
+    'he': (
+        "🔗 *שתף את שער הקהילה*\n\n"
+        "הלינק האישי שלך להפצה:\n"
+        "`{personal_link}`\n\n"
+        "מומלץ לשתף בסטורי / סטטוס / קבוצות, ולהוסיף כמה מילים אישיות משלך.\n"
+        "כל מי שייכנס דרך הלינק וילחץ על Start בבוט – יעבור דרך שער הקהילה שלך."
+    ),
+    'en': (
+        "🔗 *Share the Community Gateway*\n\n"
+        "Your personal sharing link:\n"
+        "`{personal_link}`\n\n"
+        "Recommended to share in stories/status/groups, and add some personal words of your own.\n"
+        "Anyone who enters through the link and clicks Start in the bot - will go through your community gateway."
+    ),
+    'ru': (
+        "🔗 *Поделитесь входом в сообщество*\n\n"
+        "Ваша персональная ссылка для распространения:\n"
+        "`{personal_link}`\n\n"
+        "Рекомендуется делиться в сторис/статусе/группах и добавлять несколько личных слов от себя.\n"
+        "Любой, кто войдет по ссылке и нажмет Start в боте - пройдет через ваш вход в сообщество."
+    ),
+    'ar': (
+        "🔗 *شارك بوابة المجتمع*\n\n"
+        "رابط المشاركة الشخصي الخاص بك:\n"
+        "`{personal_link}`\n\n"
+        "يوصى بالمشاركة في القصص/الحالة/المجموعات، وإضافة بعض الكلمات الشخصية منك.\n"
+        "أي شخص يدخل عبر الرابط وينقر على Start في البوت - سيمر عبر بوابة المجتمع الخاصة بك."
+    )
+}
+
+_SHARE_NO_ASSET_TEXT: Dict[str, str] = {
+    'he': (
+        "🔗 *שתף את שער הקהילה*\n\n"
+        "כדי להזמין חברים לקהילה, אפשר לשלוח להם את הקישור הבא:\n"
+        f"{LANDING_URL}\n\n"
+
+        "💝 *אפשרות צדקה - 39 שיתופים*\n"
+        "לאחר 39 שיתופים איכותיים של הקישור, תוכל לקבל גישה מלאה לקהילה ללא תשלום!\n"
+        "זו הזדמנות גם למי שידו אינה משגת להצטרף ולצמוח איתנו.\n\n"
+
+        "📢 *איך לשתף:*\n"
+        "מומלץ לשתף בסטורי / סטטוס / קבוצות\n"
+        "ולהוסיף כמה מילים אישיות משלך.\n\n"
+
+        "*כל מי שייכנס דרך הלינק וילחץ על Start בבוט - יעבור דרך שער הקהילה.*"
+    ),
+    'en': (
+        "🔗 *Share the Community Gateway*\n\n"
+        "To invite friends to the community, you can send them the following link:\n"
+        f"{LANDING_URL}\n\n"
+
+        "💝 *Charity option - 39 shares*\n"
+        "After 39 quality shares of the link, you can get full access to the community without payment!\n"
+        "This is an opportunity for those who cannot afford to join and grow with us.\n\n"
+
+        "📢 *How to share:*\n"
+        "Recommended to share in stories/status/groups\n"
+        "and add some personal words of your own.\n\n"
+
+        "*Anyone who enters through the link and clicks Start in the bot - will go through the community gateway.*"
+    ),
+    'ru': (
+        "🔗 *Поделитесь входом в сообщество*\n\n"
+        "Чтобы пригласить друзей в сообщество, вы можете отправить им следующую ссылку:\n"
+        f"{LANDING_URL}\n\n"
+
+        "💝 *Опция благотворительности - 39 репостов*\n"
+        "После 39 качественных репостов ссылки вы можете получить полный доступ к сообществу без оплаты!\n"
+        "Это возможность для тех, кто не может позволить себе присоединиться и расти с нами.\n\n"
+
+        "📢 *Как делиться:*\n"
+        "Рекомендуется делиться в сторис/статусе/группах\n"
+        "и добавлять несколько личных слов от себя.\n\n"
+
+        "*Любой, кто войдет по ссылке и нажмет Start в боте - пройдет через вход в сообщество.*"
+    ),
+    'ar': (
+        "🔗 *شارك بوابة المجتمع*\n\n"
+        "للدعوة أصدقاء إلى المجتمع، يمكنك إرسال الرابط التالي لهم:\n"
+        f"{LANDING_URL}\n\n"
+
+        "💝 *خيار خيرية - 39 مشاركة*\n"
+        "بعد 39 مشاركة ذات جودة للرابط، يمكنك الحصول على وصول كامل إلى المجتمع بدون دفع!\n"
+        "هذه فرصة لأولئك الذين لا يستطيعون تحمل تكلفة الانضمام والنمو معنا.\n\n"
+
+        "📢 *كيفية المشاركة:*\n"
+        "يوصى بالمشاركة في القصص/الحالة/المجموعات\n"
+        "وإضافة بعض الكلمات الشخصية منك.\n\n"
+
+        "*أي شخص يدخل عبر الرابط وينقر على Start في البوت - سيمر عبر بوابة المجتمع.*"
+    )
+}
+
+_VISION_TEXT: Dict[str, str] = {
+    'he': (
+        "🌟 *Human Capital Protocol - SLH*\n\n"
+
+        "💫 *מה זה SLH במשפט אחד?*\n"
+        "SLH הוא פרוטוקול הון אנושי שמחבר בין משפחות, קהילות ומומחים לרשת כלכלית אחת "
+        "– עם בוטים, חנויות, טוקן SLH, אקדמיה, משחק, ו־Exchange – כך שכל אדם יכול להפוך "
+        "לעסק, למומחה ולצומת כלכלי, מתוך הטלפון שלו.\n\n"
+
+        "🎯 *החזון ארוך־טווח:*\n"
+        "• להפוך כל אדם ומשפחה ליחידת כלכלה עצמאית\n"
+        "• לבנות רשת מסחר גלובלית מבוזרת\n"
+        "• ליצור Meta-Economy: שכבת־על טכנולוגית\n"
+        "• להפוך את SLH לסטנדרט עולמי למדידת מומחיות\n\n"
+
+        "🏗 *האקו־סיסטם המלא:*\n"
+        "• 🤖 Bots Layer - בוטי טלגרם\n"
+        "• 🛒 Commerce Layer - חנויות ומרקטפלייס\n"
+        "• ⛓️ Blockchain Layer - BSC + TON\n"
+        "• 🎓 Expertise Layer - Pi Index\n"
+        "• 🎮 Academy Layer - למידה ומשחק\n"
+        "• 💱 Exchange Layer - מסחר ונזילות\n\n"
+
+        "🚀 *Human Capital Protocol*\n"
+        "SLH אינו עוד 'אפליקציה' אלא Meta-Protocol: כמו HTTP / Email לכלכלת משפחה וקהילה. "
+        "אנשים הם האלגוריתם, המערכת רק מודדת ומתגמלת.\n\n"
+        "*ידע = הון | משפחות = נכסים | קהילות = רשתות | אנשים = פרוטוקול*"
+    ),
+    'en': (
+        "🌟 *Human Capital Protocol - SLH*\n\n"
+
+        "💫 *What is SLH in one sentence?*\n"
+        "SLH is a human capital protocol that connects families, communities and experts into one economic network "
+        "- with bots, shops, SLH token, academy, gaming, and Exchange - so that every person can become "
+        "a business, an expert and an economic node, from their phone.\n\n"
+
+        "🎯 *The long-term vision:*\n"
+        "• Turn every person and family into an independent economic unit\n"
+        "• Build a decentralized global trade network\n"
+        "• Create Meta-Economy: technological overlay layer\n"
+        "• Make SLH a global standard for measuring expertise\n\n"
+
+        "🏗 *The complete ecosystem:*\n"
+        "• 🤖 Bots Layer - Telegram bots\n"
+        "• 🛒 Commerce Layer - shops and marketplace\n"
+        "• ⛓️ Blockchain Layer - BSC + TON\n"
+        "• 🎓 Expertise Layer - Pi Index\n"
+        "• 🎮 Academy Layer - learning and gaming\n"
+        "• 💱 Exchange Layer - trading and liquidity\n\n"
+
+        "🚀 *Human Capital Protocol*\n"
+        "SLH is not another 'app' but a Meta-Protocol: like HTTP/Email for family and community economy. "
+        "People are the algorithm, the system only measures and rewards.\n\n"
+        "*Knowledge = Capital | Families = Assets | Communities = Networks | People = Protocol*"
+    ),
+    'ru': (
+        "🌟 *Протокол человеческого капитала - SLH*\n\n"
+
+        "💫 *Что такое SLH в одном предложении?*\n"
+        "SLH - это протокол человеческого капитала, который соединяет семьи, сообщества и экспертов в одну экономическую сеть "
+        "- с ботами, магазинами, токеном SLH, академией, играми и Exchange - так что каждый человек может стать "
+        "бизнесом, экспертом и экономическим узлом, со своего телефона.\n\n"
+
+        "🎯 *Долгосрочное видение:*\n"
+        "• Превратить каждого человека и семью в независимую экономическую единицу\n"
+        "• Построить децентрализованную глобальную торговую сеть\n"
+        "• Создать Meta-Economy: технологический overlay-слой\n"
+        "• Сделать SLH глобальным стандартом для измерения экспертизы\n\n"
+
+        "🏗 *Полная экосистема:*\n"
+        "• 🤖 Bots Layer - Telegram боты\n"
+        "• 🛒 Commerce Layer - магазины и маркетплейс\n"
+        "• ⛓️ Blockchain Layer - BSC + TON\n"
+        "• 🎓 Expertise Layer - Pi Index\n"
+        "• 🎮 Academy Layer - обучение и игры\n"
+        "• 💱 Exchange Layer - торговля и ликвидность\n\n"
+
+        "🚀 *Протокол человеческого капитала*\n"
+        "SLH - это не просто 'приложение', а Meta-Protocol: как HTTP/Email для семейной и общественной экономики. "
+        "Люди - это алгоритм, система только измеряет и вознаграждает.\n\n"
+        "*Знание = Капитал | Семьи = Активы | Сообщества = Сети | Люди = Протокол*"
+    ),
+    'ar': (
+        "🌟 *بروتوكول رأس المال البشري - SLH*\n\n"
+
+        "💫 *ما هو SLH في جملة واحدة؟*\n"
+        "SLH هو بروتوكول رأس المال البشري الذي يربط العائلات والمجتمعات والخبراء في شبكة اقتصادية واحدة "
+        "- مع البوتات والمتاجر ورمز SLH والأكاديمية والألعاب والتبادل - بحيث يمكن لكل شخص أن يصبح "
+        "عملًا وخبيرًا وعقدة اقتصادية، من هاتفه.\n\n"
+
+        "🎯 *الرؤية طويلة المدى:*\n"
+        "• تحويل كل شخص وعائلة إلى وحدة اقتصادية مستقلة\n"
+        "• بناء شبكة تجارية عالمية لامركزية\n"
+        "• إنشاء Meta-Economy: طبقة تقنية عليا\n"
+        "• جعل SLH معيارًا عالميًا لقياس الخبرة\n\n"
+
+        "🏗 *النظام البيئي الكامل:*\n"
+        "• 🤖 Bots Layer - بوتات Telegram\n"
+        "• 🛒 Commerce Layer - المتاجر والسوق\n"
+        "• ⛓️ Blockchain Layer - BSC + TON\n"
+        "• 🎓 Expertise Layer - Pi Index\n"
+        "• 🎮 Academy Layer - التعلم والألعاب\n"
+        "• 💱 Exchange Layer - التداول والسيولة\n\n"
+
+        "🚀 *بروتوكول رأس المال البشري*\n"
+        "SLH ليس مجرد 'تطبيق' بل بروتوكول فوقي: مثل HTTP/Email لاقتصاد الأسرة والمجتمع. "
+        "الناس هم الخوارزمية، النظام فقط يقيس ويكافئ.\n\n"
+        "*المعرفة = رأس المال | العائلات = الأصول | المجتمعات = الشبكات | الناس = البروتوكول*"
+    )
+}
+
+_HELP_TEXT: Dict[str, str] = {
+    'he': (
+        "/start – התחלה מחדש ותפריט ראשי\n"
+        "/help – עזרה\n\n"
+        "אחרי ביצוע תשלום – שלח צילום מסך של האישור לבוט.\n\n"
+        "לשיתוף שער הקהילה: כפתור '🔗 שתף את שער הקהילה' בתפריט הראשי.\n\n"
+        "למארגנים / אדמינים:\n"
+        "/admin – תפריט אדמין\n"
+        "/leaderboard – לוח מפנים (Top 10)\n"
+        "/payments_stats – סטטיסטיקות תשלומים\n"
+        "/reward_slh <user_id> <points> <reason> – יצירת Reward ל-SLH\n"
+        "/approve <user_id> – אישור תשלום\n"
+        "/reject <user_id> <סיבה> – דחיית תשלום\n"
+        "או שימוש בכפתורי האישור/דחייה ליד כל תשלום בלוגים."
+    ),
+    'en': (
+        "/start – Restart and main menu\n"
+        "/help – Help\n\n"
+        "After making payment – send screenshot of confirmation to bot.\n\n"
+        "For sharing community gateway: '🔗 Share Community Gateway' button in main menu.\n\n"
+        "For organizers/admins:\n"
+        "/admin – Admin menu\n"
+        "/leaderboard – Referrers board (Top 10)\n"
+        "/payments_stats – Payment statistics\n"
+        "/reward_slh <user_id> <points> <reason> – Create Reward for SLH\n"
+        "/approve <user_id> – Approve payment\n"
+        "/reject <user_id> <reason> – Reject payment\n"
+        "Or use approval/rejection buttons next to each payment in logs."
+    ),
+    'ru': (
+        "/start – Перезапуск и главное меню\n"
+        "/help – Помощь\n\n"
+        "После совершения оплаты – отправьте скриншот подтверждения боту.\n\n"
+        "Для распространения входа в сообщество: кнопка '🔗 Поделиться входом в сообщество' в главном меню.\n\n"
+        "Для организаторов/админов:\n"
+        "/admin – Меню админа\n"
+        "/leaderboard – Доска рефереров (Топ 10)\n"
+        "/payments_stats – Статистика платежей\n"
+        "/reward_slh <user_id> <points> <reason> – Создать Reward для SLH\n"
+        "/approve <user_id> – Одобрить платеж\n"
+        "/reject <user_id> <причина> – Отклонить платеж\n"
+        "Или используйте кнопки одобрения/отклонения рядом с каждым платежом в логах."
+    ),
+    'ar': (
+        "/start – إعادة البدء والقائمة الرئيسية\n"
+        "/help – مساعدة\n\n"
+        "بعد إجراء الدفع – أرسل لقطة شاشة للتأكيد إلى البوت.\n\n"
+        "لمشاركة بوابة المجتمع: زر '🔗 مشاركة بوابة المجتمع' في القائمة الرئيسية.\n\n"
+        "للمنظمين/المسؤولين:\n"
+        "/admin – قائمة المسؤول\n"
+        "/leaderboard – لوحة المحيلين (أعلى 10)\n"
+        "/payments_stats – إحصائيات الدفع\n"
+        "/reward_slh <user_id> <points> <reason> – إنشاء مكافأة لـ SLH\n"
+        "/approve <user_id> – الموافقة على الدفع\n"
+        "/reject <user_id> <السبب> – رفض الدفع\n"
+        "أو استخدم أزرار الموافقة/الرفض بجانب كل دفعة في السجلات."
+    )
+}
+
+_LANG_PROMPT_TEXT: Dict[str, str] = {
+    'he': "🌐 *בחר שפה:*",
+    'en': "🌐 *Choose language:*",
+    'ru': "🌐 *Выберите язык:*", 
+    'ar': "🌐 *اختر اللغة:*"
+}
+
+
 # =========================
 # Handlers – לוגיקת הבוט
 # =========================
 
+async def _send_welcome(message: Message, lang: str, lang_prompt: bool = False) -> None:
+    """
+    שולח את הודעת הפתיחה בשפה הנתונה.
+    עם lang_prompt – מצרף את הצעת בחירת השפה ומקלדת השפות במקום המקלדת היציבה.
+    """
+    text, entities = _WELCOME_RENDERED[(lang, lang_prompt)]
+    reply_markup = _LANGUAGE_KB if lang_prompt else _STABLE_KB[lang]
+
+    await message.reply_text(
+        text,
+        entities=entities,
+        reply_markup=reply_markup,
+    )
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    message = update.message or update.effective_message
+    message = update.effective_message
     if not message:
         return
 
+    # נקראים פעם אחת בתחילת ה-handler (כולל השעון – זמן קבלת העדכון)
+    now_str = _now_str()
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
+    uid = user.id if user else None
+    chat_id = message.chat_id
+    user_data = context.user_data
+
+    # פענוח קוד ההפניה לפני כל פנייה ל-DB – כדי לרשום אותו יחד עם המשתמש
+    referrer_id: Optional[int] = None
+    m = _REF_RE.match(message.text) if message.text and user else None
+    if m:
+        referrer_id = int(m.group(1))
+        if referrer_id == uid:
+            referrer_id = None
 
     # בדיקה אם זה משתמש חדש או תהליך תקוע
     is_new_user = False
+    referral_stored = False
     has_stuck_payment = False
+    # האם למשתמש כבר יש שפה שמורה – מה-bootstrap או מבחירה קודמת בתהליך הזה
+    has_lang = user_data is not None and "lang_chosen" in user_data
     
     if DB_AVAILABLE and user:
-        try:
-            # בדיקה אם משתמש חדש
-            existing_user = get_user(user.id)
-            if not existing_user:
-                is_new_user = True
-                store_user(user.id, user.username)
-                incr_metric("total_starts")
-            
-            # בדיקה אם יש תשלום תלוי יותר מ-24 שעות
-            pending_count = get_pending_payments_count(user.id)
-            if pending_count > 0:
-                has_stuck_payment = True
-        except Exception as e:
-            logger.error("Failed to check user status: %s", e)
+        # משתמש שנבדק לאחרונה – כבר קיים ומספר התשלומים התלויים שלו ידוע
+        pending_count = _PENDING_COUNT_CACHE.get(uid)
+        if pending_count is None:
+            try:
+                # קיום משתמש + תשלומים תלויים (מעל 24 שעות) + שפה – שאילתה אחת
+                exists, pending_count, db_lang = await asyncio.to_thread(get_user_bootstrap, uid)
+                if not exists:
+                    is_new_user = await asyncio.to_thread(
+                        store_user_if_new, uid, user.username, referrer_id
+                    )
+                    referral_stored = referrer_id is not None
+                    if is_new_user:
+                        bump_metric("total_starts")
+                if db_lang:
+                    has_lang = True
+                    cache_user_language(uid, db_lang)
+                    if user_data is not None:
+                        user_data["lang_chosen"] = db_lang
+                _PENDING_COUNT_CACHE[uid] = pending_count
+            except Exception as e:
+                logger.error("Failed to check user status: %s", e)
+                pending_count = 0
+        if pending_count > 0:
+            has_stuck_payment = True
+
+    lang = get_context_language(context, user)
 
     # לוג לקבוצת התשלומים רק למשתמשים חדשים או תהליך תקוע
-    if (is_new_user or has_stuck_payment) and PAYMENTS_LOG_CHAT_ID and update.effective_user:
+    if (is_new_user or has_stuck_payment) and PAYMENTS_LOG_CHAT_ID and user:
+        log_text = _START_LOG_TMPL.format_map({
+            "user_id": uid,
+            "username": _fmt_username(user),
+            "chat_id": chat_id,
+            "status": "🆕 משתמש חדש" if is_new_user else "⚠️ תהליך תקוע",
+            "ts": now_str,
+        })
+        enqueue_payments_log("send_message", text=log_text, parse_mode="Markdown")
+
+    # טיפול ב-referral – למשתמש חדש ההפניה כבר נרשמה יחד עם המשתמש
+    if referrer_id is not None and DB_AVAILABLE:
         try:
-            user_obj = update.effective_user
-            username_str = f"@{user_obj.username}" if user_obj.username else "(ללא username)"
-            status_note = "🆕 משתמש חדש" if is_new_user else "⚠️ תהליך תקוע"
-            
-            log_text = (
-                f"{trans_manager.get_text('new_user_start', 'he')}\n\n"
-                f"👤 user_id: `{user_obj.id}`\n"
-                f"📛 username: {username_str}\n"
-                f"💬 chat_id: `{update.effective_chat.id}`\n"
-                f"📊 סטטוס: {status_note}\n"
-                f"🕐 זמן: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            )
-            await context.bot.send_message(
-                chat_id=PAYMENTS_LOG_CHAT_ID,
-                text=log_text,
-                parse_mode="Markdown",
-            )
+            if not referral_stored:
+                await asyncio.to_thread(add_referral, referrer_id, uid, source="bot_start")
+            logger.info("Referral added: %s -> %s", referrer_id, uid)
         except Exception as e:
-            logger.error("Failed to send /start log to payments group: %s", e)
-
-    # טיפול ב-referral
-    if message.text and message.text.startswith("/start") and user:
-        parts = message.text.split()
-        if len(parts) > 1 and parts[1].startswith("ref_"):
-            try:
-                referrer_id = int(parts[1].split("ref_")[1])
-                if DB_AVAILABLE and referrer_id != user.id:
-                    add_referral(referrer_id, user.id, source="bot_start")
-                    logger.info("Referral added: %s -> %s", referrer_id, user.id)
-            except Exception as e:
-                logger.error("Failed to add referral: %s", e)
+            logger.error("Failed to add referral: %s", e)
 
     # שליחת הודעת ברוכים הבאים
-    welcome_text = {
-        'he': (
-            "🎉 *ברוך הבא לנכס הדיגיטלי המניב שלך!*\n\n"
-            
-            "💎 *מה זה הנכס הדיגיטלי?*\n"
-            "זהו שער כניסה אישי לקהילת עסקים פעילה. לאחר רכישה תקבל:\n"
-            "• לינק אישי להפצה\n"
-            "• אפשרות למכור את הנכס הלאה\n"
-            "• גישה לקבוצת משחק כללית\n"
-            "• מערכת הפניות מתגמלת\n\n"
-            
-            "🔄 *איך זה עובד?*\n"
-            "1. רוכשים נכס ב-39₪\n"
-            "2. מקבלים לינק אישי\n"
-            "3. מפיצים - כל רכישה דרך הלינק שלך מתועדת\n"
-            "4. מרוויחים מהפצות נוספות\n\n"
-            
-            "🚀 *מה תקבל?*\n"
-            "✅ גישה לקהילת עסקים\n"
-            "✅ נכס דיגיטלי אישי\n"
-            "✅ לינק הפצה ייחודי\n"
-            "✅ אפשרות מכירה חוזרת\n"
-            "✅ מערכת הפניות שקופה\n\n"
-            
-            "💼 *הנכס שלך - העסק שלך!*"
-        ),
-        'en': (
-            "🎉 *Welcome to your profitable digital asset!*\n\n"
-            
-            "💎 *What is the Digital Asset?*\n"
-            "This is a personal gateway to an active business community. After purchase you get:\n"
-            "• Personal sharing link\n"
-            "• Ability to resell the asset\n"
-            "• Access to general community group\n"
-            "• Rewarding referral system\n\n"
-            
-            "🔄 *How it works?*\n"
-            "1. Buy an asset for 39₪\n"
-            "2. Get personal link\n"
-            "3. Share - every purchase through your link is recorded\n"
-            "4. Earn from additional referrals\n\n"
-            
-            "🚀 *What you get?*\n"
-            "✅ Access to business community\n"
-            "✅ Personal digital asset\n"
-            "✅ Unique sharing link\n"
-            "✅ Resale option\n"
-            "✅ Transparent referral system\n\n"
-            
-            "💼 *Your Asset - Your Business!*"
-        ),
-        'ru': (
-            "🎉 *Добро пожаловать в ваш прибыльный цифровой актив!*\n\n"
-            
-            "💎 *Что такое цифровой актив?*\n"
-            "Это персональный вход в активное бизнес-сообщество. После покупки вы получаете:\n"
-            "• Персональную ссылку для распространения\n"
-            "• Возможность перепродажи актива\n"
-            "• Доступ к общей группе сообщества\n"
-            "• Вознаграждающую реферальную систему\n\n"
-            
-            "🔄 *Как это работает?*\n"
-            "1. Покупаете актив за 39₪\n"
-            "2. Получаете персональную ссылку\n"
-            "3. Распространяете - каждая покупка по вашей ссылке записывается\n"
-            "4. Зарабатываете на дополнительных рефералах\n\n"
-            
-            "🚀 *Что вы получаете?*\n"
-            "✅ Доступ к бизнес-сообществу\n"
-            "✅ Персональный цифровой актив\n"
-            "✅ Уникальную ссылку для распространения\n"
-            "✅ Опцию перепродажи\n"
-            "✅ Прозрачную реферальную систему\n\n"
-            
-            "💼 *Ваш актив - Ваш бизнес!*"
-        ),
-        'ar': (
-            "🎉 *مرحبًا بك في أصولك الرقمية المربحة!*\n\n"
-            
-            "💎 *ما هي الأصول الرقمية؟*\n"
-            "هذا هو المدخل الشخصي لمجتمع الأعمال النشط. بعد الشراء تحصل على:\n"
-            "• رابط مشاركة شخصي\n"
-            "• إمكانية إعادة بيع الأصل\n"
-            "• الوصول إلى مجموعة المجتمع العامة\n"
-            "• نظام إحالة مجزي\n\n"
-            
-            "🔄 *كيف يعمل؟*\n"
-            "1. شراء أصل بـ 39₪\n"
-            "2. الحصول على رابط شخصي\n"
-            "3. شارك - يتم تسجيل كل عملية شراء من خلال رابطك\n"
-            "4. اربح من الإحالات الإضافية\n\n"
-            
-            "🚀 *ماذا تحصل؟*\n"
-            "✅ الوصول إلى مجتمع الأعمال\n"
-            "✅ الأصول الرقمية الشخصية\n"
-            "✅ رابط مشاركة فريد\n"
-            "✅ خيار إعادة البيع\n"
-            "✅ نظام إحالة شفاف\n\n"
-            
-            "💼 *أصولك - عملك!*"
-        )
-    }
-
-    text = welcome_text.get(lang, welcome_text['he'])
-
-    await message.reply_text(
-        text,
-        parse_mode="Markdown",
-        reply_markup=get_stable_keyboard(lang),
-    )
-
-    # הצעה לבחירת שפה אם עדיין לא נבחרה
-    if DB_AVAILABLE and user and (not get_user_language(user.id) or is_new_user):
-        lang_prompt = {
-            'he': "🌐 *בחר שפה / Choose language*",
-            'en': "🌐 *Choose language / اختر اللغة*", 
-            'ru': "🌐 *Выберите язык / اختر اللغة*",
-            'ar': "🌐 *اختر اللغة / Choose language*"
-        }
-        await message.reply_text(
-            lang_prompt.get(lang, lang_prompt['he']),
-            reply_markup=language_keyboard()
-        )
+    # הצעה לבחירת שפה אם עדיין לא נבחרה – באותה הודעה, לא בהודעה נפרדת.
+    # המקלדת היציבה תישלח עם הודעת הפתיחה שאחרי בחירת השפה.
+    lang_prompt = bool(DB_AVAILABLE and user and (is_new_user or not has_lang))
+    await _send_welcome(message, lang, lang_prompt)
 
 async def handle_language_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """מטפל בבחירת שפה"""
     query = update.callback_query
-    await query.answer()
-    
+
     user = update.effective_user
-    lang = query.data.replace('lang_', '')
-    
+    lang = normalize_lang(query.data.replace('lang_', ''))
+
+    # לחיצה חוזרת על השפה שכבר נבחרה – אין שינוי מצב, לא כותבים ולא שולחים
+    user_data = context.user_data
+    if user_data is not None and user_data.get("lang_chosen") == lang:
+        await query.answer("✓", show_alert=False)
+        return
+    await query.answer()
+
     if DB_AVAILABLE and user:
         try:
-            update_user_language(user.id, lang)
+            await asyncio.to_thread(update_user_language, user.id, lang)
         except Exception as e:
             logger.error("Failed to update user language: %s", e)
-    
+            invalidate_user_language(user.id)
+        else:
+            # השפה נשמרה ב-DB – מעדכנים את המטמון (עם TTL) ואת סימון הבחירה
+            cache_user_language(user.id, lang)
+            if user_data is not None:
+                user_data["lang_chosen"] = lang
+
     # הודעת אישור
-    confirmation = {
-        'he': "✅ שפה נבחרה: עברית",
-        'en': "✅ Language selected: English", 
-        'ru': "✅ Язык выбран: Русский",
-        'ar': "✅ تم اختيار اللغة: العربية"
-    }
+    await query.edit_message_text(_LANG_SELECTED_TEXT[lang])
     
-    await query.edit_message_text(
-        confirmation.get(lang, confirmation['he'])
-    )
-    
-    # שליחת הודעת ברוכים הבאים מחדש בשפה החדשה
-    fake_update = Update(update_id=update.update_id, message=query.message)
-    await start(fake_update, context)
-
-async def digital_asset_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    await query.answer()
-    
-    user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
+    # שליחת הודעת ברוכים הבאים מחדש בשפה החדשה – המשתמש כבר ידוע, אין צורך
+    # להריץ שוב את כל מסלול /start
+    if query.message:
+        await _send_welcome(query.message, lang)
 
-    text = {
-        'he': (
-            "💎 *הנכס הדיגיטלי - ההזדמנות העסקית שלך!*\n\n"
-            
-            "🏗 *מה זה בעצם?*\n"
-            "נכס דיגיטלי הוא 'שער כניסה' אישי שאתה קונה פעם אחת ב-39₪ ומקבל:\n"
-            "• לינק אישי משלך\n"
-            "• זכות למכור נכסים נוספים\n"
-            "• גישה למערכת שלמה\n\n"
-            
-            "💸 *איך מרוויחים?*\n"
-            "1. אתה רוכש נכס ב-39₪\n"
-            "2. מקבל לינק אישי להפצה\n"
-            "3 *כל אדם* שקונה דרך הלינק שלך - הרכישה מתועדת לזכותך\n"
-            "4. הנכס שלך ממשיך להניב הכנסות\n\n"
-            
-            "🔄 *מודל מכירה חוזרת:*\n"
-            "אתה לא רק 'משתמש' - אתה 'בעל נכס'!\n"
-            "יכול למכור נכסים נוספים לאחרים\n"
-            "כל רכישה נוספת מתועדת בשרשרת ההפניה\n\n"
-            
-            "📈 *יתרונות:*\n"
-            "• הכנסה פסיבית מהפצות\n"
-            "• נכס ששווה יותר עם הזמן\n"
-            "• קהילה תומכת\n"
-            "• שקיפות מלאה\n\n"
-            
-            "🎯 *המטרה:* ליצור רשת עסקית שבה כולם מרוויחים!"
-        ),
-        'en': (
-            "💎 *The Digital Asset - Your Business Opportunity!*\n\n"
-            
-            "🏗 *What is it actually?*\n"
-            "A digital asset is a personal 'gateway' that you buy once for 39₪ and get:\n"
-            "• Your personal link\n"
-            "• Right to sell additional assets\n"
-            "• Access to complete system\n\n"
-            
-            "💸 *How to earn?*\n"
-            "1. You buy an asset for 39₪\n"
-            "2. Get personal sharing link\n"
-            "3 *Every person* who buys through your link - purchase recorded to your credit\n"
-            "4. Your asset continues to generate income\n\n"
-            
-            "🔄 *Resale model:*\n"
-            "You're not just a 'user' - you're an 'asset owner'!\n"
-            "Can sell additional assets to others\n"
-            "Every additional purchase is recorded in referral chain\n\n"
-            
-            "📈 *Advantages:*\n"
-            "• Passive income from sharing\n"
-            "• Asset that gains value over time\n"
-            "• Supportive community\n"
-            "• Full transparency\n\n"
-            
-            "🎯 *The goal:* Create business network where everyone wins!"
-        ),
-        'ru': (
-            "💎 *Цифровой актив - Ваша бизнес-возможность!*\n\n"
-            
-            "🏗 *Что это на самом деле?*\n"
-            "Цифровой актив - это персональный 'вход', который вы покупаете один раз за 39₪ и получаете:\n"
-            "• Вашу персональную ссылку\n"
-            "• Право продавать дополнительные активы\n"
-            "• Доступ к полной системе\n\n"
-            
-            "💸 *Как заработать?*\n"
-            "1. Вы покупаете актив за 39₪\n"
-            "2. Получаете персональную ссылку для распространения\n"
-            "3 *Каждый человек*, который покупает по вашей ссылке - покупка записывается в ваш зачет\n"
-            "4. Ваш актив продолжает генерировать доход\n\n"
-            
-            "🔄 *Модель перепродажи:*\n"
-            "Вы не просто 'пользователь' - вы 'владелец актива'!\n"
-            "Можете продавать дополнительные активы другим\n"
-            "Каждая дополнительная покупка записывается в реферальную цепочку\n\n"
-            
-            "📈 *Преимущества:*\n"
-            "• Пассивный доход от распространения\n"
-            "• Актив, который со временем растет в цене\n"
-            "• Поддерживающее сообщество\n"
-            "• Полная прозрачность\n\n"
-            
-            "🎯 *Цель:* Создать бизнес-сеть, где выигрывают все!"
-        ),
-        'ar': (
-            "💎 *الأصول الرقمية - فرصة عملك!*\n\n"
-            
-            "🏗 *ما هو في الواقع؟*\n"
-            "الأصل الرقمي هو 'بوابة' شخصية تشتريها مرة واحدة بـ 39₪ وتحصل على:\n"
-            "• رابطك الشخصي\n"
-            "• الحق في بيع أصول إضافية\n"
-            "• الوصول إلى النظام الكامل\n\n"
-            
-            "💸 *كيف تربح؟*\n"
-            "1. تشتري أصلًا بـ 39₪\n"
-            "2. تحصل على رابط مشاركة شخصي\n"
-            "3 *كل شخص* يشتري من خلال رابطك - يتم تسجيل الشراء لرصيدك\n"
-            "4. أصولك تستمر في تحقيق الدخل\n\n"
-            
-            "🔄 *نموذج إعادة البيع:*\n"
-            "أنت لست مجرد 'مستخدم' - أنت 'مالك أصول'!\n"
-            "يمكنك بيع أصول إضافية للآخرين\n"
-            "يتم تسجيل كل عملية شراء إضافية في سلسلة الإحالة\n\n"
-            
-            "📈 *مزايا:*\n"
-            "• دخل سلبي من المشاركة\n"
-            "• أصول تزداد قيمة مع الوقت\n"
-            "• مجتمع داعم\n"
-            "• شفافية كاملة\n\n"
-            
-            "🎯 *الهدف:* إنشاء شبكة أعمال حيث يربح الجميع!"
-        )
-    }
+# ליבות התפריט: מקבלות את פונקציית השליחה (עריכת ההודעה מ-callback, או
+# תשובה חדשה מהמקלדת היציבה), את המשתמש ואת השפה – בלי Update.
 
-    await query.edit_message_text(
-        text.get(lang, text['he']),
+async def _handle_asset_info(respond: Callable, user: Optional[User], lang: str) -> None:
+    await respond(
+        _ASSET_INFO_TEXT[lang],
         parse_mode="Markdown",
-        reply_markup=main_menu_keyboard(lang),
+        reply_markup=_MAIN_MENU_KB[lang],
     )
 
-async def join_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    await query.answer()
-    
-    user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-
-    text = {
-        'he': (
-            "🔑 *רכישת הנכס הדיגיטלי - 39₪*\n\n"
-            "בתמורה ל-39₪ תקבל:\n"
-            "• נכס דיגיטלי אישי\n"
-            "• לינק הפצה ייחודי\n"
-            "• גישה לקהילת עסקים\n"
-            "• אפשרות למכור נכסים נוספים\n\n"
-            
-            "🔄 *איך התהליך עובד?*\n"
-            "1. בוחרים אמצעי תשלום\n"
-            "2. משלמים 39₪\n"
-            "3. שולחים אישור תשלום\n"
-            "4. מקבלים אישור + לינק אישי\n"
-            "5. מתחילים להפיץ!\n\n"
-            
-            "💼 *זכור:* אתה קונה *נכס* - לא רק 'גישה'!"
-        ),
-        'en': (
-            "🔑 *Digital Asset Purchase - 39₪*\n\n"
-            "In return for 39₪ you get:\n"
-            "• Personal digital asset\n"
-            "• Unique sharing link\n"
-            "• Access to business community\n"
-            "• Ability to sell additional assets\n\n"
-            
-            "🔄 *How the process works?*\n"
-            "1. Choose payment method\n"
-            "2. Pay 39₪\n"
-            "3. Send payment confirmation\n"
-            "4. Get approval + personal link\n"
-            "5. Start sharing!\n\n"
-            
-            "💼 *Remember:* You're buying an *asset* - not just 'access'!"
-        ),
-        'ru': (
-            "🔑 *Покупка цифрового актива - 39₪*\n\n"
-            "Взамен на 39₪ вы получаете:\n"
-            "• Персональный цифровой актив\n"
-            "• Уникальную ссылку для распространения\n"
-            "• Доступ к бизнес-сообществу\n"
-            "• Возможность продавать дополнительные активы\n\n"
-            
-            "🔄 *Как работает процесс?*\n"
-            "1. Выбираете способ оплаты\n"
-            "2. Платите 39₪\n"
-            "3. Отправляете подтверждение оплаты\n"
-            "4. Получаете одобрение + персональную ссылку\n"
-            "5. Начинаете распространять!\n\n"
-            
-            "💼 *Помните:* Вы покупаете *актив* - не просто 'доступ'!"
-        ),
-        'ar': (
-            "🔑 *شراء الأصول الرقمية - 39₪*\n\n"
-            "في مقابل 39₪ تحصل على:\n"
-            "• الأصول الرقمية الشخصية\n"
-            "• رابط مشاركة فريد\n"
-            "• الوصول إلى مجتمع الأعمال\n"
-            "• القدرة على بيع أصول إضافية\n\n"
-            
-            "🔄 *كيف تعمل العملية؟*\n"
-            "1. اختر طريقة الدفع\n"
-            "2. ادفع 39₪\n"
-            "3. أرسل تأكيد الدفع\n"
-            "4. احصل على الموافقة + الرابط الشخصي\n"
-            "5. ابدأ المشاركة!\n\n"
-            "💼 *تذكر:* أنت تشتري *أصولًا* - ليس مجرد 'وصول'!"
-        )
-    }
-
-    await query.edit_message_text(
-        text.get(lang, text['he']),
+async def _handle_join(respond: Callable, user: Optional[User], lang: str) -> None:
+    await respond(
+        _JOIN_TEXT[lang],
         parse_mode="Markdown",
-        reply_markup=payment_methods_keyboard(lang),
+        reply_markup=_PAY_METHODS_KB[lang],
     )
 
-async def my_area_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    await query.answer()
-
-    user = update.effective_user
+async def _handle_my_area(respond: Callable, user: Optional[User], lang: str) -> None:
     if not user:
         return
 
-    lang = trans_manager.get_user_language(user.id)
-
     if DB_AVAILABLE:
-        summary = get_promoter_summary(user.id)
+        summary = await asyncio.to_thread(get_promoter_summary, user.id)
         if summary:
             personal_link = build_personal_share_link(user.id)
             bank = summary.get("bank_details") or "לא הוגדר"
             p_group = summary.get("personal_group_link") or "לא הוגדר"
             total_ref = summary.get("total_referrals", 0)
             
-            text = {
-                'he': (
-                    "👤 *האזור האישי שלך*\n\n"
-                    f"🔗 *לינק אישי:*\n`{personal_link}`\n\n"
-                    f"🏦 *פרטי בנק:*\n{bank}\n\n"
-                    f"👥 *קבוצה אישית:*\n{p_group}\n\n"
-                    f"📊 *הפניות:* {total_ref}\n\n"
-                    "*ניהול נכס:*"
-                ),
-                'en': (
-                    "👤 *Your Personal Area*\n\n"
-                    f"🔗 *Personal link:*\n`{personal_link}`\n\n"
-                    f"🏦 *Bank details:*\n{bank}\n\n"
-                    f"👥 *Personal group:*\n{p_group}\n\n"
-                    f"📊 *Referrals:* {total_ref}\n\n"
-                    "*Asset management:*"
-                ),
-                'ru': (
-                    "👤 *Ваша личная зона*\n\n"
-                    f"🔗 *Персональная ссылка:*\n`{personal_link}`\n\n"
-                    f"🏦 *Банковские реквизиты:*\n{bank}\n\n"
-                    f"👥 *Персональная группа:*\n{p_group}\n\n"
-                    f"📊 *Рефералы:* {total_ref}\n\n"
-                    "*Управление активом:*"
-                ),
-                'ar': (
-                    "👤 *منطقتك الشخصية*\n\n"
-                    f"🔗 *رابط شخصي:*\n`{personal_link}`\n\n"
-                    f"🏦 *تفاصيل البنك:*\n{bank}\n\n"
-                    f"👥 *مجموعة شخصية:*\n{p_group}\n\n"
-                    f"📊 *الإحالات:* {total_ref}\n\n"
-                    "*إدارة الأصول:*"
-                )
-            }
+            text = _MY_AREA_TEXT[lang].format(
+                personal_link=personal_link, bank=bank, p_group=p_group, total_ref=total_ref
+            )
         else:
-            text = {
-                'he': (
-                    "👤 *האזור האישי שלך*\n\n"
-                    "עדיין אין לך נכס דיגיטלי.\n"
-                    "רכש נכס כדי לקבל:\n"
-                    "• לינק אישי להפצה\n"
-                    "• אפשרות למכור נכסים\n"
-                    "• גישה למערכת המלאה"
-                ),
-                'en': (
-                    "👤 *Your Personal Area*\n\n"
-                    "You don't have a digital asset yet.\n"
-                    "Purchase an asset to get:\n"
-                    "• Personal sharing link\n"
-                    "• Ability to sell assets\n"
-                    "• Access to full system"
-                ),
-                'ru': (
-                    "👤 *Ваша личная зона*\n\n"
-                    "У вас еще нет цифрового актива.\n"
-                    "Приобретите актив, чтобы получить:\n"
-                    "• Персональную ссылку для распространения\n"
-                    "• Возможность продавать активы\n"
-                    "• Доступ к полной системе"
-                ),
-                'ar': (
-                    "👤 *منطقتك الشخصية*\n\n"
-                    "ليس لديك أصول رقمية بعد.\n"
-                    "شراء أصول للحصول على:\n"
-                    "• رابط مشاركة شخصي\n"
-                    "• القدرة على بيع الأصول\n"
-                    "• الوصول إلى النظام الكامل"
-                )
-            }
+            text = _MY_AREA_NO_ASSET_TEXT[lang]
     else:
-        text = {
-            'he': "מערכת הזמנית לא זמינה. נסה שוב מאוחר יותר.",
-            'en': "Temporary system unavailable. Try again later.",
-            'ru': "Временная система недоступна. Попробуйте позже.",
-            'ar': "النظام المؤقت غير متاح. حاول مرة أخرى لاحقًا."
-        }
+        text = _SYSTEM_UNAVAILABLE_TEXT[lang]
 
-    await query.edit_message_text(
-        text.get(lang, text['he']),
+    await respond(
+        text,
         parse_mode="Markdown",
-        reply_markup=my_area_keyboard(lang),
+        reply_markup=_MY_AREA_KB[lang],
     )
 
+async def digital_asset_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    user = update.effective_user
+    await _handle_asset_info(query.edit_message_text, user, get_context_language(context, user))
+
+async def join_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    user = update.effective_user
+    await _handle_join(query.edit_message_text, user, get_context_language(context, user))
+
+async def my_area_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    user = update.effective_user
+    await _handle_my_area(query.edit_message_text, user, get_context_language(context, user))
+
 async def payment_method_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
     data = query.data
     
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-
-    method_text = ""
-    if data == "pay_bank":
-        method_text = BANK_DETAILS
-        context.user_data["last_pay_method"] = "bank"
-    elif data == "pay_paybox":
-        method_text = "📲 *תשלום בביט / פייבוקס / PayPal*"
-        context.user_data["last_pay_method"] = "paybox"
-    elif data == "pay_ton":
-        method_text = "💎 *תשלום ב-TON*"
-        context.user_data["last_pay_method"] = "ton"
-    else:
-        context.user_data["last_pay_method"] = "unknown"
-
-    text = {
-        'he': (
-            f"{method_text}\n\n"
-            "💎 *לאחר התשלום:*\n"
-            "1. שלח צילום מסך של האישור\n"
-            "2. נאשר בתוך זמן קצר\n"
-            "3. תקבל את הנכס הדיגיטלי שלך\n"
-            "4. תוכל להתחיל להפיץ ולהרוויח!\n\n"
-            "*זכור:* אתה רוכש *נכס* - לא רק גישה!"
-        ),
-        'en': (
-            f"{method_text}\n\n"
-            "💎 *After payment:*\n"
-            "1. Send screenshot of confirmation\n"
-            "2. We'll approve shortly\n"
-            "3. You'll receive your digital asset\n"
-            "4. You can start sharing and earning!\n\n"
-            "*Remember:* You're buying an *asset* - not just access!"
-        ),
-        'ru': (
-            f"{method_text}\n\n"
-            "💎 *После оплаты:*\n"
-            "1. Отправьте скриншот подтверждения\n"
-            "2. Мы одобрим в ближайшее время\n"
-            "3. Вы получите ваш цифровой актив\n"
-            "4. Вы можете начать распространять и зарабатывать!\n\n"
-            "*Помните:* Вы покупаете *актив* - не просто доступ!"
-        ),
-        'ar': (
-            f"{method_text}\n\n"
-            "💎 *بعد الدفع:*\n"
-            "1. أرسل لقطة شاشة للتأكيد\n"
-            "2. سنوافق قريبًا\n"
-            "3. سوف تتلقى أصولك الرقمية\n"
-            "4. يمكنك البدء في المشاركة والربح!\n\n"
-            "*تذكر:* أنت تشتري *أصولًا* - ليس مجرد وصول!"
-        )
-    }
+    lang = get_context_language(context, user)
+
+    key, method_text = _PAY_METHODS.get(data, _PAY_METHOD_UNKNOWN)
+    context.user_data["last_pay_method"] = key
 
     await query.edit_message_text(
-        text.get(lang, text['he']),
+        _PAY_INSTRUCTIONS_TEXT[lang].format(method_text=method_text),
         parse_mode="Markdown",
-        reply_markup=payment_links_keyboard(lang),
+        reply_markup=_PAY_LINKS_KB[lang],
     )
 
 async def handle_payment_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1347,23 +2133,12 @@ async def handle_payment_photo(update: Update, context: ContextTypes.DEFAULT_TYP
     if not user:
         return
 
+    now_str = _now_str()
     chat_id = message.chat_id
-    username = f"@{user.username}" if user.username else "(ללא username)"
+    username = _fmt_username(user)
 
     pay_method = context.user_data.get("last_pay_method", "unknown")
-    pay_method_text = {
-        "bank": "העברה בנקאית",
-        "paybox": "ביט / פייבוקס / PayPal",
-        "ton": "טלגרם (TON)",
-        "unknown": "לא ידוע",
-    }.get(pay_method, "לא ידוע")
-
-    # לוג ל-DB
-    if DB_AVAILABLE:
-        try:
-            log_payment(user.id, username, pay_method_text)
-        except Exception as e:
-            logger.error("Failed to log payment to DB: %s", e)
+    pay_method_text = _PAY_METHOD_LABELS.get(pay_method, "לא ידוע")
 
     # שליחת אישור לקבוצת הלוגים
     photo = message.photo[-1]
@@ -1378,235 +2153,187 @@ async def handle_payment_photo(update: Update, context: ContextTypes.DEFAULT_TYP
     }
 
     # הודעת אישור תשלום לקבוצת הלוגים
-    caption_log = (
-        f"{trans_manager.get_text('payment_confirmation', 'he')}\n\n"
-        f"👤 user_id: `{user.id}`\n"
-        f"📛 username: {username}\n"
-        f"💳 שיטת תשלום: {pay_method_text}\n"
-        f"🕐 זמן: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        f"*{trans_manager.get_text('admin_approval_notice', 'he')}*"
+    caption_log = _PAYMENT_LOG_TMPL.format_map({
+        "user_id": user.id,
+        "username": username,
+        "pay_method": pay_method_text,
+        "ts": now_str,
+    })
+
+    # הודעת אישור למשתמש – קודם, לפני כל שליחה לקבוצת הלוגים
+    user_lang = get_context_language(context, user)
+    await message.reply_text(
+        _PAY_CONFIRM_TEXT[user_lang],
+        parse_mode="Markdown",
     )
 
+    # צילום האישור נושא את כפתורי האישור/דחייה – לא עובר בתור (שעלול להשמיט),
+    # אלא במשימה שהאפליקציה עוקבת אחריה, מחוץ למסלול התשובה למשתמש
+    if PAYMENTS_LOG_CHAT_ID:
+        context.application.create_task(
+            _send_payment_proof(context, user.id, file_id, caption_log),
+            update=update,
+        )
+
+    # לוג ל-DB – ברקע, אחרי שהמשתמש כבר קיבל אישור
+    if DB_AVAILABLE:
+        context.application.create_task(
+            _log_payment_in_background(user.id, username, pay_method_text),
+            update=update,
+        )
+
+async def _send_payment_proof(
+    context: ContextTypes.DEFAULT_TYPE, user_id: int, file_id: str, caption: str
+) -> None:
+    """שולח את צילום האישור לקבוצת התשלומים; AIORateLimiter מווסת את הקצב"""
     try:
         await context.bot.send_photo(
             chat_id=PAYMENTS_LOG_CHAT_ID,
             photo=file_id,
-            caption=caption_log,
+            caption=caption,
             parse_mode="Markdown",
-            reply_markup=admin_approval_keyboard(user.id, 'he'),
+            reply_markup=admin_approval_keyboard(user_id, 'he'),
         )
     except Exception as e:
-        logger.error("Failed to send payment to log group: %s", e)
-
-    # הודעת אישור למשתמש
-    user_lang = trans_manager.get_user_language(user.id)
-    confirmation_text = {
-        'he': (
-            "✅ *אישור התשלום התקבל!*\n\n"
-            "האישור נשלח לצוות שלנו לאימות.\n"
-            "תקבל הודעה עם הנכס הדיגיטלי שלך בתוך זמן קצר.\n\n"
-            "💎 *מה תקבל לאחר אישור:*\n"
-            "• לינק אישי להפצה\n"
-            "• גישה לקהילה\n"
-            "• אפשרות למכור נכסים נוספים"
-        ),
-        'en': (
-            "✅ *Payment Confirmation Received!*\n\n"
-            "The confirmation has been sent to our team for verification.\n"
-            "You will receive your digital asset shortly.\n\n"
-            "💎 *What you get after approval:*\n"
-            "• Personal sharing link\n"
-            "• Community access\n"
-            "• Ability to sell additional assets"
-        ),
-        'ru': (
-            "✅ *Подтверждение оплаты получено!*\n\n"
-            "Подтверждение отправлено нашей команде для проверки.\n"
-            "Вы получите ваш цифровой актив в ближайшее время.\n\n"
-            "💎 *Что вы получите после одобрения:*\n"
-            "• Персональная ссылка для распространения\n"
-            "• Доступ к сообществу\n"
-            "• Возможность продавать дополнительные активы"
-        ),
-        'ar': (
-            "✅ *تم استلام تأكيد الدفع!*\n\n"
-            "تم إرسال التأكيد إلى فريقنا للتحقق.\n"
-            "ستستلم أصولك الرقمية قريبًا.\n\n"
-            "💎 *ما الذي تحصل عليه بعد الموافقة:*\n"
-            "• رابط مشاركة شخصي\n"
-            "• الوصول إلى المجتمع\n"
-            "• القدرة على بيع أصول إضافية"
+        logger.error(
+            "Failed to send payment proof of user %s to payments group (file_id=%s): %s",
+            user_id, file_id, e,
         )
-    }
 
-    await message.reply_text(
-        confirmation_text.get(user_lang, confirmation_text['he']),
-        parse_mode="Markdown",
-    )
+# חוסם את מספר כתיבות ה-DB שרצות ברקע במקביל – בעומס הן ממתינות כאן
+# ולא תופסות את כל ה-threads / חיבורי ה-DB
+_BACKGROUND_DB_SEM = asyncio.Semaphore(8)
+
+async def _incr_metric_in_background(name: str) -> None:
+    try:
+        async with _BACKGROUND_DB_SEM:
+            await asyncio.to_thread(incr_metric, name)
+    except Exception as e:
+        logger.error("Failed to increment metric %s: %s", name, e)
+
+def bump_metric(name: str) -> None:
+    """מעלה מונה ב-DB ברקע – לא על מסלול התשובה למשתמש"""
+    if DB_AVAILABLE:
+        ptb_app.create_task(_incr_metric_in_background(name))
+
+async def _log_payment_in_background(user_id: int, username: str, pay_method_text: str) -> None:
+    try:
+        async with _BACKGROUND_DB_SEM:
+            await asyncio.to_thread(log_payment, user_id, username, pay_method_text)
+    except Exception as e:
+        logger.error("Failed to log payment to DB: %s", e)
+    invalidate_pending_payments(user_id)
+
+_SEND_ATTEMPTS = 3
+
+async def with_retries(coro_factory: Callable, attempts: int = _SEND_ATTEMPTS) -> Any:
+    """
+    מריץ קריאת API לטלגרם עם ניסיונות חוזרים על TimedOut (המתנה קצרה עולה).
+    RetryAfter מטופל כבר ע"י AIORateLimiter. ההודעה אולי כבר נמסרה לפני
+    ה-TimeOut, לכן משמש רק לתשובות לאדמין – לא להודעות למשתמשים.
+    הניסיון האחרון מעביר את החריגה הלאה לקורא.
+    """
+    for i in range(attempts - 1):
+        try:
+            return await coro_factory()
+        except TimedOut:
+            await asyncio.sleep(1 + i)
+    return await coro_factory()
+
+def _approve_payment_db(target_id: int) -> None:
+    update_payment_status(target_id, "approved", None)
+    ensure_promoter(target_id)
+
+async def _update_payment_db(func: Callable, *args: Any) -> None:
+    """מריץ עדכון תשלום סינכרוני ב-thread ומאפס את מטמון התשלומים התלויים"""
+    if not DB_AVAILABLE:
+        return
+    try:
+        await asyncio.to_thread(func, *args)
+    except Exception as e:
+        logger.error("Failed to update DB: %s", e)
+    invalidate_pending_payments(args[0])
+
+async def _notify_delivery_failed(source_message, target_id: int, what: str) -> None:
+    """
+    מודיע לאדמין שההודעה למשתמש לא נמסרה (עדכון ה-DB כבר בוצע),
+    כדי שיוכל לשלוח שוב ולא יישאר משתמש שלא יודע על ההחלטה.
+    """
+    if not source_message:
+        return
+    try:
+        await source_message.reply_text(
+            f"⚠️ {what} נשמר ב-DB אך ההודעה למשתמש {target_id} לא נמסרה – יש לשלוח שוב."
+        )
+    except Exception as e:
+        logger.error("Failed to notify admin about delivery failure: %s", e)
 
 async def do_approve(target_id: int, context: ContextTypes.DEFAULT_TYPE, source_message) -> None:
+    now_str = _now_str()
     personal_link = build_personal_share_link(target_id)
     
-    # הודעת אישור למשתמש
-    user_lang = trans_manager.get_user_language(target_id)
-    approval_text = {
-        'he': (
-            "🎉 *התשלום אושר! ברוך הבא לבעלי הנכסים!*\n\n"
-            
-            "💎 *הנכס הדיגיטלי שלך מוכן:*\n"
-            f"🔗 *לינק אישי:* `{personal_link}`\n\n"
-            
-            "🚀 *מה עכשיו?*\n"
-            "1. שתף את הלינק עם אחרים\n"
-            "2. כל רכישה דרך הלינק שלך מתועדת\n"
-            "3. תוכל למכור נכסים נוספים\n"
-            "4. צבור הכנסה מהפצות\n\n"
-            
-            "👥 *גישה לקהילה:*\n"
-            f"{COMMUNITY_GROUP_LINK}\n\n"
-            
-            "💼 *ניהול הנכס:*\n"
-            "השתמש בכפתור '👤 האזור האישי שלי'\n"
-            "כדי להגדיר פרטי בנק וקבוצות"
-        ),
-        'en': (
-            "🎉 *Payment Approved! Welcome Asset Owner!*\n\n"
-            
-            "💎 *Your digital asset is ready:*\n"
-            f"🔗 *Personal link:* `{personal_link}`\n\n"
-            
-            "🚀 *What now?*\n"
-            "1. Share the link with others\n"
-            "2. Every purchase through your link is recorded\n"
-            "3. You can sell additional assets\n"
-            "4. Accumulate income from sharing\n\n"
-            
-            "👥 *Community access:*\n"
-            f"{COMMUNITY_GROUP_LINK}\n\n"
-            
-            "💼 *Asset management:*\n"
-            "Use the '👤 My Personal Area' button\n"
-            "to set bank details and groups"
-        ),
-        'ru': (
-            "🎉 *Оплата подтверждена! Добро пожаловать, владелец актива!*\n\n"
-            
-            "💎 *Ваш цифровой актив готов:*\n"
-            f"🔗 *Персональная ссылка:* `{personal_link}`\n\n"
-            
-            "🚀 *Что теперь?*\n"
-            "1. Поделитесь ссылкой с другими\n"
-            "2. Каждая покупка по вашей ссылке записывается\n"
-            "3. Вы можете продавать дополнительные активы\n"
-            "4. Накопите доход от распространения\n\n"
-            "👥 *Доступ к сообществу:*\n"
-            f"{COMMUNITY_GROUP_LINK}\n\n"
-            
-            "💼 *Управление активом:*\n"
-            "Используйте кнопку '👤 Моя личная зона'\n"
-            "чтобы установить банковские реквизиты и группы"
-        ),
-        'ar': (
-            "🎉 *تمت الموافقة على الدفع! مرحبًا بك مالک الأصول!*\n\n"
-            
-            "💎 *أصولك الرقمية جاهزة:*\n"
-            f"🔗 *رابط شخصي:* `{personal_link}`\n\n"
-            
-            "🚀 *ماذا الآن؟*\n"
-            "1. شارك الرابط مع الآخرين\n"
-            "2. يتم تسجيل كل عملية شراء من خلال رابطك\n"
-            "3. يمكنك بيع أصول إضافية\n"
-            "4. تراكم الدخل من المشاركة\n\n"
-            "👥 *الوصول إلى المجتمع:*\n"
-            f"{COMMUNITY_GROUP_LINK}\n\n"
-            
-            "💼 *إدارة الأصول:*\n"
-            "استخدم زر '👤 منطقتي الشخصية'\n"
-            "لتعيين تفاصيل البنك والمجموعات"
-        )
-    }
-
-    try:
-        await context.bot.send_message(
+    # הודעת אישור למשתמש ועדכון ה-DB רצים במקביל
+    user_lang = get_user_language(target_id)
+    approval_text = _APPROVAL_TMPL[user_lang].format(personal_link=personal_link)
+    send_result, _ = await asyncio.gather(
+        context.bot.send_message(
             chat_id=target_id, 
-            text=approval_text.get(user_lang, approval_text['he']), 
+            text=approval_text,
             parse_mode="Markdown",
-            reply_markup=get_stable_keyboard(user_lang)
-        )
-        
-        # אישור העברת תשלום לקבוצת הלוגים
-        approval_notice = (
-            f"✅ *אישור העברת תשלום* ✅\n\n"
-            f"👤 user_id: `{target_id}`\n"
-            f"🕐 זמן אישור: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"🔗 לינק אישי: `{personal_link}`\n\n"
-            f"*התשלום אושר והמשתמש קיבל את הנכס הדיגיטלי שלו*"
-        )
-        
-        await context.bot.send_message(
-            chat_id=PAYMENTS_LOG_CHAT_ID,
-            text=approval_notice,
-            parse_mode="Markdown"
-        )
-        
-        # עדכון DB
-        if DB_AVAILABLE:
-            try:
-                update_payment_status(target_id, "approved", None)
-                ensure_promoter(target_id)
-                incr_metric("approved_payments")
-            except Exception as e:
-                logger.error("Failed to update DB: %s", e)
+            reply_markup=_STABLE_KB[user_lang]
+        ),
+        _update_payment_db(_approve_payment_db, target_id),
+        return_exceptions=True,
+    )
+    # ה-DB כבר מסמן את התשלום כמאושר – גם אם ההודעה למשתמש נכשלה
+    _HAS_ASSET.pop(target_id, None)
+    if isinstance(send_result, Exception):
+        logger.error("Failed to send approval to user %s: %s", target_id, send_result)
+        await _notify_delivery_failed(source_message, target_id, "האישור")
+        return
+    bump_metric("approved_payments")
+
+    # אישור העברת תשלום לקבוצת הלוגים
+    approval_notice = _APPROVAL_LOG_TMPL.format_map({
+        "user_id": target_id,
+        "ts": now_str,
+        "personal_link": personal_link,
+    })
+    
+    enqueue_payments_log("send_message", text=approval_notice, parse_mode="Markdown")
 
-        if source_message:
-            await source_message.reply_text(f"✅ אושר למשתמש {target_id} - נשלח נכס דיגיטלי")
-            
-    except Exception as e:
-        logger.error("Failed to send approval: %s", e)
+    get_payments_store(context).pop(target_id, None)
+
+    if source_message:
+        try:
+            await with_retries(lambda: source_message.reply_text(f"✅ אושר למשתמש {target_id} - נשלח נכס דיגיטלי"))
+        except Exception as e:
+            logger.error("Failed to send approval: %s", e)
 
 async def do_reject(target_id: int, reason: str, context: ContextTypes.DEFAULT_TYPE, source_message) -> None:
-    user_lang = trans_manager.get_user_language(target_id)
-    rejection_text = {
-        'he': (
-            "❌ *אישור התשלום נדחה*\n\n"
-            f"*סיבה:* {reason}\n\n"
-            "אם לדעתך מדובר בטעות, פנה לתמיכה."
-        ),
-        'en': (
-            "❌ *Payment Approval Rejected*\n\n"
-            f"*Reason:* {reason}\n\n"
-            "If you think this is a mistake, contact support."
-        ),
-        'ru': (
-            "❌ *Подтверждение оплаты отклонено*\n\n"
-            f"*Причина:* {reason}\n\n"
-            "Если вы считаете, что это ошибка, обратитесь в поддержку."
-        ),
-        'ar': (
-            "❌ *تم رفض تأكيد الدفع*\n\n"
-            f"*السبب:* {reason}\n\n"
-            "إذا كنت تعتقد أن هذا خطأ، اتصل بالدعم."
-        )
-    }
-    
-    try:
-        await context.bot.send_message(
+    user_lang = get_user_language(target_id)
+    rejection_text = _REJECTION_TEXT[user_lang].format(reason=reason)
+
+    # הודעת הדחייה למשתמש ועדכון ה-DB רצים במקביל
+    send_result, _ = await asyncio.gather(
+        context.bot.send_message(
             chat_id=target_id, 
-            text=rejection_text.get(user_lang, rejection_text['he']), 
+            text=rejection_text, 
             parse_mode="Markdown"
-        )
-        
-        if DB_AVAILABLE:
-            try:
-                update_payment_status(target_id, "rejected", reason)
-            except Exception as e:
-                logger.error("Failed to update DB: %s", e)
-                
-        if source_message:
-            await source_message.reply_text(f"❌ נדחה למשתמש {target_id}")
-            
-    except Exception as e:
-        logger.error("Failed to send rejection: %s", e)
+        ),
+        _update_payment_db(update_payment_status, target_id, "rejected", reason),
+        return_exceptions=True,
+    )
+    if isinstance(send_result, Exception):
+        logger.error("Failed to send rejection to user %s: %s", target_id, send_result)
+        await _notify_delivery_failed(source_message, target_id, "הדחייה")
+        return
+
+    if source_message:
+        try:
+            await with_retries(lambda: source_message.reply_text(f"❌ נדחה למשתמש {target_id}"))
+        except Exception as e:
+            logger.error("Failed to send rejection: %s", e)
 
 # =========================
 # Admin handlers
@@ -1614,10 +2341,10 @@ async def do_reject(target_id: int, reason: str, context: ContextTypes.DEFAULT_T
 
 async def admin_approve_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
-    await query.answer()
     admin = query.from_user
 
-    if admin.id not in ADMIN_IDS:
+    # query.answer נשלח פעם אחת בלבד בכל מסלול
+    if not (admin.id == _SINGLE_ADMIN_ID or admin.id in ADMIN_IDS):
         await query.answer("אין הרשאה", show_alert=True)
         return
 
@@ -1629,14 +2356,16 @@ async def admin_approve_callback(update: Update, context: ContextTypes.DEFAULT_T
         await query.answer("שגיאה", show_alert=True)
         return
 
+    await query.answer(cache_time=30)
+
     await do_approve(target_id, context, query.message)
 
 async def admin_reject_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
-    await query.answer()
     admin = query.from_user
 
-    if admin.id not in ADMIN_IDS:
+    # query.answer נשלח פעם אחת בלבד בכל מסלול
+    if not (admin.id == _SINGLE_ADMIN_ID or admin.id in ADMIN_IDS):
         await query.answer("אין הרשאה", show_alert=True)
         return
 
@@ -1648,16 +2377,18 @@ async def admin_reject_callback(update: Update, context: ContextTypes.DEFAULT_TY
         await query.answer("שגיאה", show_alert=True)
         return
 
+    await query.answer(cache_time=30)
+
     pending = get_pending_rejects(context)
     pending[admin.id] = target_id
 
-    await query.message.reply_text(
+    await with_retries(lambda: query.message.reply_text(
         f"❌ דחייה למשתמש {target_id}\nשלח סיבה:"
-    )
+    ))
 
 async def admin_reject_reason_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    if user is None or user.id not in ADMIN_IDS:
+    if user is None or not (user.id == _SINGLE_ADMIN_ID or user.id in ADMIN_IDS):
         return
 
     pending = get_pending_rejects(context)
@@ -1678,295 +2409,65 @@ async def back_main_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     fake_update = Update(update_id=update.update_id, message=query.message)
     await start(fake_update, context)
 
-async def support_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    await query.answer()
-
-    user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-
-    text = {
-        'he': (
-            "🆘 *תמיכה ועזרה*\n\n"
-            "בכל שלב אפשר לקבל עזרה באחד הערוצים הבאים:\n\n"
-            f"• קבוצת תמיכה: {SUPPORT_GROUP_LINK}\n"
-            f"• פניה ישירה למתכנת המערכת: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
-            "או חזור לתפריט הראשי:"
-        ),
-        'en': (
-            "🆘 *Support and Help*\n\n"
-            "At any stage you can get help in one of the following channels:\n\n"
-            f"• Support group: {SUPPORT_GROUP_LINK}\n"
-            f"• Direct contact with system developer: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
-            "Or return to main menu:"
-        ),
-        'ru': (
-            "🆘 *Поддержка и помощь*\n\n"
-            "На любом этапе вы можете получить помощь в одном из следующих каналов:\n\n"
-            f"• Группа поддержки: {SUPPORT_GROUP_LINK}\n"
-            f"• Прямой контакт с разработчиком системы: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
-            "Или вернуться в главное меню:"
-        ),
-        'ar': (
-            "🆘 *الدعم والمساعدة*\n\n"
-            "في أي مرحلة يمكنك الحصول على المساعدة في إحدى القنوات التالية:\n\n"
-            f"• مجموعة الدعم: {SUPPORT_GROUP_LINK}\n"
-            f"• الاتصال المباشر مع مطور النظام: `tg://user?id={DEVELOPER_USER_ID}`\n\n"
-            "أو العودة إلى القائمة الرئيسية:"
-        )
-    }
-
-    await query.edit_message_text(
-        text.get(lang, text['he']),
+async def _handle_support(respond: Callable, user: Optional[User], lang: str) -> None:
+    await respond(
+        _SUPPORT_TEXT[lang],
         parse_mode="Markdown",
-        reply_markup=support_keyboard(lang),
+        reply_markup=_SUPPORT_KB[lang],
     )
 
-async def share_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    await query.answer()
-
-    user = update.effective_user
+async def _handle_share(respond: Callable, user: Optional[User], lang: str) -> None:
     if not user:
         return
 
-    lang = trans_manager.get_user_language(user.id)
-
     # בדיקה אם יש למשתמש כבר נכס
-    has_asset = False
-    if DB_AVAILABLE:
+    has_asset = _HAS_ASSET.get(user.id, False)
+    if DB_AVAILABLE and user.id not in _HAS_ASSET:
         try:
-            summary = get_promoter_summary(user.id)
+            summary = await asyncio.to_thread(get_promoter_summary, user.id)
             has_asset = summary is not None
+            _HAS_ASSET[user.id] = has_asset
         except Exception:
             has_asset = False
 
     if has_asset:
         # אם יש לו נכס - הלינק האישי שלו
         personal_link = build_personal_share_link(user.id)
-        text = {
-            'he': (
-                "🔗 *שתף את שער הקהילה*\n\n"
-                "הלינק האישי שלך להפצה:\n"
-                f"`{personal_link}`\n\n"
-                "מומלץ לשתף בסטורי / סטטוס / קבוצות, ולהוסיף כמה מילים אישיות משלך.\n"
-                "כל מי שייכנס דרך הלינק וילחץ על Start בבוט – יעבור דרך שער הקהילה שלך."
-            ),
-            'en': (
-                "🔗 *Share the Community Gateway*\n\n"
-                "Your personal sharing link:\n"
-                f"`{personal_link}`\n\n"
-                "Recommended to share in stories/status/groups, and add some personal words of your own.\n"
-                "Anyone who enters through the link and clicks Start in the bot - will go through your community gateway."
-            ),
-            'ru': (
-                "🔗 *Поделитесь входом в сообщество*\n\n"
-                "Ваша персональная ссылка для распространения:\n"
-                f"`{personal_link}`\n\n"
-                "Рекомендуется делиться в сторис/статусе/группах и добавлять несколько личных слов от себя.\n"
-                "Любой, кто войдет по ссылке и нажмет Start в боте - пройдет через ваш вход в сообщество."
-            ),
-            'ar': (
-                "🔗 *شارك بوابة المجتمع*\n\n"
-                "رابط المشاركة الشخصي الخاص بك:\n"
-                f"`{personal_link}`\n\n"
-                "يوصى بالمشاركة في القصص/الحالة/المجموعات، وإضافة بعض الكلمات الشخصية منك.\n"
-                "أي شخص يدخل عبر الرابط وينقر على Start في البوت - سيمر عبر بوابة المجتمع الخاصة بك."
-            )
-        }
+        text = _SHARE_TEXT[lang].format(personal_link=personal_link)
     else:
         # אם אין לו נכס - הלינק הכללי + הסבר על 39 שיתופים
-        text = {
-            'he': (
-                "🔗 *שתף את שער הקהילה*\n\n"
-                "כדי להזמין חברים לקהילה, אפשר לשלוח להם את הקישור הבא:\n"
-                f"{LANDING_URL}\n\n"
-                
-                "💝 *אפשרות צדקה - 39 שיתופים*\n"
-                "לאחר 39 שיתופים איכותיים של הקישור, תוכל לקבל גישה מלאה לקהילה ללא תשלום!\n"
-                "זו הזדמנות גם למי שידו אינה משגת להצטרף ולצמוח איתנו.\n\n"
-                
-                "📢 *איך לשתף:*\n"
-                "מומלץ לשתף בסטורי / סטטוס / קבוצות\n"
-                "ולהוסיף כמה מילים אישיות משלך.\n\n"
-                
-                "*כל מי שייכנס דרך הלינק וילחץ על Start בבוט - יעבור דרך שער הקהילה.*"
-            ),
-            'en': (
-                "🔗 *Share the Community Gateway*\n\n"
-                "To invite friends to the community, you can send them the following link:\n"
-                f"{LANDING_URL}\n\n"
-                
-                "💝 *Charity option - 39 shares*\n"
-                "After 39 quality shares of the link, you can get full access to the community without payment!\n"
-                "This is an opportunity for those who cannot afford to join and grow with us.\n\n"
-                
-                "📢 *How to share:*\n"
-                "Recommended to share in stories/status/groups\n"
-                "and add some personal words of your own.\n\n"
-                
-                "*Anyone who enters through the link and clicks Start in the bot - will go through the community gateway.*"
-            ),
-            'ru': (
-                "🔗 *Поделитесь входом в сообщество*\n\n"
-                "Чтобы пригласить друзей в сообщество, вы можете отправить им следующую ссылку:\n"
-                f"{LANDING_URL}\n\n"
-                
-                "💝 *Опция благотворительности - 39 репостов*\n"
-                "После 39 качественных репостов ссылки вы можете получить полный доступ к сообществу без оплаты!\n"
-                "Это возможность для тех, кто не может позволить себе присоединиться и расти с нами.\n\n"
-                
-                "📢 *Как делиться:*\n"
-                "Рекомендуется делиться в сторис/статусе/группах\n"
-                "и добавлять несколько личных слов от себя.\n\n"
-                
-                "*Любой, кто войдет по ссылке и нажмет Start в боте - пройдет через вход в сообщество.*"
-            ),
-            'ar': (
-                "🔗 *شارك بوابة المجتمع*\n\n"
-                "للدعوة أصدقاء إلى المجتمع، يمكنك إرسال الرابط التالي لهم:\n"
-                f"{LANDING_URL}\n\n"
-                
-                "💝 *خيار خيرية - 39 مشاركة*\n"
-                "بعد 39 مشاركة ذات جودة للرابط، يمكنك الحصول على وصول كامل إلى المجتمع بدون دفع!\n"
-                "هذه فرصة لأولئك الذين لا يستطيعون تحمل تكلفة الانضمام والنمو معنا.\n\n"
-                
-                "📢 *كيفية المشاركة:*\n"
-                "يوصى بالمشاركة في القصص/الحالة/المجموعات\n"
-                "وإضافة بعض الكلمات الشخصية منك.\n\n"
-                
-                "*أي شخص يدخل عبر الرابط وينقر على Start في البوت - سيمر عبر بوابة المجتمع.*"
-            )
-        }
+        text = _SHARE_NO_ASSET_TEXT[lang]
 
-    await query.message.reply_text(
-        text.get(lang, text['he']),
+    await respond(
+        text,
         parse_mode="Markdown",
     )
 
-async def vision_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def _handle_vision(respond: Callable, user: Optional[User], lang: str) -> None:
+    await respond(
+        _VISION_TEXT[lang],
+        parse_mode="Markdown",
+        reply_markup=_MAIN_MENU_KB[lang],
+    )
+
+async def support_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
+    await _handle_support(query.edit_message_text, user, get_context_language(context, user))
 
-    text = {
-        'he': (
-            "🌟 *Human Capital Protocol - SLH*\n\n"
-            
-            "💫 *מה זה SLH במשפט אחד?*\n"
-            "SLH הוא פרוטוקול הון אנושי שמחבר בין משפחות, קהילות ומומחים לרשת כלכלית אחת "
-            "– עם בוטים, חנויות, טוקן SLH, אקדמיה, משחק, ו־Exchange – כך שכל אדם יכול להפוך "
-            "לעסק, למומחה ולצומת כלכלי, מתוך הטלפון שלו.\n\n"
-            
-            "🎯 *החזון ארוך־טווח:*\n"
-            "• להפוך כל אדם ומשפחה ליחידת כלכלה עצמאית\n"
-            "• לבנות רשת מסחר גלובלית מבוזרת\n"
-            "• ליצור Meta-Economy: שכבת־על טכנולוגית\n"
-            "• להפוך את SLH לסטנדרט עולמי למדידת מומחיות\n\n"
-            
-            "🏗 *האקו־סיסטם המלא:*\n"
-            "• 🤖 Bots Layer - בוטי טלגרם\n"
-            "• 🛒 Commerce Layer - חנויות ומרקטפלייס\n"
-            "• ⛓️ Blockchain Layer - BSC + TON\n"
-            "• 🎓 Expertise Layer - Pi Index\n"
-            "• 🎮 Academy Layer - למידה ומשחק\n"
-            "• 💱 Exchange Layer - מסחר ונזילות\n\n"
-            
-            "🚀 *Human Capital Protocol*\n"
-            "SLH אינו עוד 'אפליקציה' אלא Meta-Protocol: כמו HTTP / Email לכלכלת משפחה וקהילה. "
-            "אנשים הם האלגוריתם, המערכת רק מודדת ומתגמלת.\n\n"
-            "*ידע = הון | משפחות = נכסים | קהילות = רשתות | אנשים = פרוטוקול*"
-        ),
-        'en': (
-            "🌟 *Human Capital Protocol - SLH*\n\n"
-            
-            "💫 *What is SLH in one sentence?*\n"
-            "SLH is a human capital protocol that connects families, communities and experts into one economic network "
-            "- with bots, shops, SLH token, academy, gaming, and Exchange - so that every person can become "
-            "a business, an expert and an economic node, from their phone.\n\n"
-            
-            "🎯 *The long-term vision:*\n"
-            "• Turn every person and family into an independent economic unit\n"
-            "• Build a decentralized global trade network\n"
-            "• Create Meta-Economy: technological overlay layer\n"
-            "• Make SLH a global standard for measuring expertise\n\n"
-            
-            "🏗 *The complete ecosystem:*\n"
-            "• 🤖 Bots Layer - Telegram bots\n"
-            "• 🛒 Commerce Layer - shops and marketplace\n"
-            "• ⛓️ Blockchain Layer - BSC + TON\n"
-            "• 🎓 Expertise Layer - Pi Index\n"
-            "• 🎮 Academy Layer - learning and gaming\n"
-            "• 💱 Exchange Layer - trading and liquidity\n\n"
-            
-            "🚀 *Human Capital Protocol*\n"
-            "SLH is not another 'app' but a Meta-Protocol: like HTTP/Email for family and community economy. "
-            "People are the algorithm, the system only measures and rewards.\n\n"
-            "*Knowledge = Capital | Families = Assets | Communities = Networks | People = Protocol*"
-        ),
-        'ru': (
-            "🌟 *Протокол человеческого капитала - SLH*\n\n"
-            
-            "💫 *Что такое SLH в одном предложении?*\n"
-            "SLH - это протокол человеческого капитала, который соединяет семьи, сообщества и экспертов в одну экономическую сеть "
-            "- с ботами, магазинами, токеном SLH, академией, играми и Exchange - так что каждый человек может стать "
-            "бизнесом, экспертом и экономическим узлом, со своего телефона.\n\n"
-            
-            "🎯 *Долгосрочное видение:*\n"
-            "• Превратить каждого человека и семью в независимую экономическую единицу\n"
-            "• Построить децентрализованную глобальную торговую сеть\n"
-            "• Создать Meta-Economy: технологический overlay-слой\n"
-            "• Сделать SLH глобальным стандартом для измерения экспертизы\n\n"
-            
-            "🏗 *Полная экосистема:*\n"
-            "• 🤖 Bots Layer - Telegram боты\n"
-            "• 🛒 Commerce Layer - магазины и маркетплейс\n"
-            "• ⛓️ Blockchain Layer - BSC + TON\n"
-            "• 🎓 Expertise Layer - Pi Index\n"
-            "• 🎮 Academy Layer - обучение и игры\n"
-            "• 💱 Exchange Layer - торговля и ликвидность\n\n"
-            
-            "🚀 *Протокол человеческого капитала*\n"
-            "SLH - это не просто 'приложение', а Meta-Protocol: как HTTP/Email для семейной и общественной экономики. "
-            "Люди - это алгоритм, система только измеряет и вознаграждает.\n\n"
-            "*Знание = Капитал | Семьи = Активы | Сообщества = Сети | Люди = Протокол*"
-        ),
-        'ar': (
-            "🌟 *بروتوكول رأس المال البشري - SLH*\n\n"
-            
-            "💫 *ما هو SLH في جملة واحدة؟*\n"
-            "SLH هو بروتوكول رأس المال البشري الذي يربط العائلات والمجتمعات والخبراء في شبكة اقتصادية واحدة "
-            "- مع البوتات والمتاجر ورمز SLH والأكاديمية والألعاب والتبادل - بحيث يمكن لكل شخص أن يصبح "
-            "عملًا وخبيرًا وعقدة اقتصادية، من هاتفه.\n\n"
-            
-            "🎯 *الرؤية طويلة المدى:*\n"
-            "• تحويل كل شخص وعائلة إلى وحدة اقتصادية مستقلة\n"
-            "• بناء شبكة تجارية عالمية لامركزية\n"
-            "• إنشاء Meta-Economy: طبقة تقنية عليا\n"
-            "• جعل SLH معيارًا عالميًا لقياس الخبرة\n\n"
-            
-            "🏗 *النظام البيئي الكامل:*\n"
-            "• 🤖 Bots Layer - بوتات Telegram\n"
-            "• 🛒 Commerce Layer - المتاجر والسوق\n"
-            "• ⛓️ Blockchain Layer - BSC + TON\n"
-            "• 🎓 Expertise Layer - Pi Index\n"
-            "• 🎮 Academy Layer - التعلم والألعاب\n"
-            "• 💱 Exchange Layer - التداول والسيولة\n\n"
-            
-            "🚀 *بروتوكول رأس المال البشري*\n"
-            "SLH ليس مجرد 'تطبيق' بل بروتوكول فوقي: مثل HTTP/Email لاقتصاد الأسرة والمجتمع. "
-            "الناس هم الخوارزمية، النظام فقط يقيس ويكافئ.\n\n"
-            "*المعرفة = رأس المال | العائلات = الأصول | المجتمعات = الشبكات | الناس = البروتوكول*"
-        )
-    }
+async def share_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    user = update.effective_user
+    # קישור השיתוף נשלח כהודעה חדשה (נוחה להעברה), לא כעריכה
+    await _handle_share(query.message.reply_text, user, get_context_language(context, user))
 
-    await query.edit_message_text(
-        text.get(lang, text['he']),
-        parse_mode="Markdown",
-        reply_markup=main_menu_keyboard(lang),
-    )
+async def vision_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    user = update.effective_user
+    await _handle_vision(query.edit_message_text, user, get_context_language(context, user))
 
 # =========================
 # Additional command handlers
@@ -1974,139 +2475,74 @@ async def vision_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """עזרה בסיסית"""
-    message = update.message or update.effective_message
+    message = update.effective_message
     if not message:
         return
 
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-
-    text = {
-        'he': (
-            "/start – התחלה מחדש ותפריט ראשי\n"
-            "/help – עזרה\n\n"
-            "אחרי ביצוע תשלום – שלח צילום מסך של האישור לבוט.\n\n"
-            "לשיתוף שער הקהילה: כפתור '🔗 שתף את שער הקהילה' בתפריט הראשי.\n\n"
-            "למארגנים / אדמינים:\n"
-            "/admin – תפריט אדמין\n"
-            "/leaderboard – לוח מפנים (Top 10)\n"
-            "/payments_stats – סטטיסטיקות תשלומים\n"
-            "/reward_slh <user_id> <points> <reason> – יצירת Reward ל-SLH\n"
-            "/approve <user_id> – אישור תשלום\n"
-            "/reject <user_id> <סיבה> – דחיית תשלום\n"
-            "או שימוש בכפתורי האישור/דחייה ליד כל תשלום בלוגים."
-        ),
-        'en': (
-            "/start – Restart and main menu\n"
-            "/help – Help\n\n"
-            "After making payment – send screenshot of confirmation to bot.\n\n"
-            "For sharing community gateway: '🔗 Share Community Gateway' button in main menu.\n\n"
-            "For organizers/admins:\n"
-            "/admin – Admin menu\n"
-            "/leaderboard – Referrers board (Top 10)\n"
-            "/payments_stats – Payment statistics\n"
-            "/reward_slh <user_id> <points> <reason> – Create Reward for SLH\n"
-            "/approve <user_id> – Approve payment\n"
-            "/reject <user_id> <reason> – Reject payment\n"
-            "Or use approval/rejection buttons next to each payment in logs."
-        ),
-        'ru': (
-            "/start – Перезапуск и главное меню\n"
-            "/help – Помощь\n\n"
-            "После совершения оплаты – отправьте скриншот подтверждения боту.\n\n"
-            "Для распространения входа в сообщество: кнопка '🔗 Поделиться входом в сообщество' в главном меню.\n\n"
-            "Для организаторов/админов:\n"
-            "/admin – Меню админа\n"
-            "/leaderboard – Доска рефереров (Топ 10)\n"
-            "/payments_stats – Статистика платежей\n"
-            "/reward_slh <user_id> <points> <reason> – Создать Reward для SLH\n"
-            "/approve <user_id> – Одобрить платеж\n"
-            "/reject <user_id> <причина> – Отклонить платеж\n"
-            "Или используйте кнопки одобрения/отклонения рядом с каждым платежом в логах."
-        ),
-        'ar': (
-            "/start – إعادة البدء والقائمة الرئيسية\n"
-            "/help – مساعدة\n\n"
-            "بعد إجراء الدفع – أرسل لقطة شاشة للتأكيد إلى البوت.\n\n"
-            "لمشاركة بوابة المجتمع: زر '🔗 مشاركة بوابة المجتمع' في القائمة الرئيسية.\n\n"
-            "للمنظمين/المسؤولين:\n"
-            "/admin – قائمة المسؤول\n"
-            "/leaderboard – لوحة المحيلين (أعلى 10)\n"
-            "/payments_stats – إحصائيات الدفع\n"
-            "/reward_slh <user_id> <points> <reason> – إنشاء مكافأة لـ SLH\n"
-            "/approve <user_id> – الموافقة على الدفع\n"
-            "/reject <user_id> <السبب> – رفض الدفع\n"
-            "أو استخدم أزرار الموافقة/الرفض بجانب كل دفعة في السجلات."
-        )
-    }
+    lang = get_context_language(context, user)
 
-    await message.reply_text(text.get(lang, text['he']))
+    await message.reply_text(_HELP_TEXT[lang])
 
 async def language_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """פקודת בחירת שפה"""
-    message = update.message or update.effective_message
+    message = update.effective_message
     if not message:
         return
 
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-
-    prompt_text = {
-        'he': "🌐 *בחר שפה:*",
-        'en': "🌐 *Choose language:*",
-        'ru': "🌐 *Выберите язык:*", 
-        'ar': "🌐 *اختر اللغة:*"
-    }
+    lang = get_context_language(context, user)
 
     await message.reply_text(
-        prompt_text.get(lang, prompt_text['he']),
-        reply_markup=language_keyboard()
+        _LANG_PROMPT_TEXT[lang],
+        reply_markup=_LANGUAGE_KB
     )
 
 # =========================
 # Handler for stable keyboard text messages
 # =========================
 
+# אינדקס הפוך: טקסט כפתור (בכל השפות) -> פעולה. נבנה פעם אחת אחרי שכל
+# ה-handlers הוגדרו; התוויות שונות בין השפות, כך שאין התנגשויות.
+_BUTTON_KEYS: List[Tuple[str, Callable]] = [
+    ("join_community", _handle_join),
+    ("digital_asset_info", _handle_asset_info),
+    ("share_gateway", _handle_share),
+    ("slh_vision", _handle_vision),
+    ("my_area", _handle_my_area),
+    ("support", _handle_support),
+]
+_BUTTONS: Dict[str, Callable] = {
+    sys.intern(get_text(key, lang)): action
+    for lang in _LANGS
+    for key, action in _BUTTON_KEYS
+}
+
 async def handle_stable_keyboard_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """מטפל בהודעות טקסט מהמקלדת היציבה"""
     message = update.message
-    if not message or not message.text:
+    if not message:
+        return
+    text = message.text
+    # פקודות מטופלות ע"י CommandHandler – יציאה מיידית
+    if not text or text[0] == '/':
         return
 
     user = update.effective_user
-    lang = trans_manager.get_user_language(user.id) if user else 'he'
-    
-    text = message.text
-    
-    # מיפוי טקסט הכפתורים לפעולות
-    button_actions = {
-        trans_manager.get_text("join_community", lang): join_callback,
-        trans_manager.get_text("digital_asset_info", lang): digital_asset_info,
-        trans_manager.get_text("share_gateway", lang): share_callback,
-        trans_manager.get_text("slh_vision", lang): vision_callback,
-        trans_manager.get_text("my_area", lang): my_area_callback,
-        trans_manager.get_text("support", lang): support_callback,
-    }
-    
-    # חיפוש הפעולה המתאימה
-    for button_text, action in button_actions.items():
-        if text == button_text:
-            # יצירת callback query מדומה
-            fake_query = type('obj', (object,), {
-                'data': action.__name__.replace('_callback', ''),
-                'answer': lambda: None,
-                'message': message,
-                'edit_message_text': message.reply_text,
-                'from_user': user
-            })
-            fake_update = Update(update_id=update.update_id, callback_query=fake_query)
-            await action(fake_update, context)
-            return
+
+    # חיפוש הפעולה המתאימה – lookup אחד בכל השפות
+    # (גם מקלדת ישנה בשפה קודמת ממשיכה לעבוד)
+    action = _BUTTONS.get(text)
+    lang = get_context_language(context, user)
+    if action is not None:
+        # אותה ליבה כמו ב-callback, רק שהתשובה נשלחת כהודעה חדשה
+        await action(message.reply_text, user, lang)
+        return
     
     # אם לא נמצאה פעולה - שליחת הודעת ברירת מחדל
     await message.reply_text(
-        trans_manager.get_text("main_menu", lang),
-        reply_markup=get_stable_keyboard(lang)
+        get_text("main_menu", lang),
+        reply_markup=_STABLE_KB[lang]
     )
 
 # =========================
@@ -2118,21 +2554,41 @@ ptb_app.add_handler(CommandHandler("help", help_command))
 ptb_app.add_handler(CommandHandler("language", language_command))
 ptb_app.add_handler(CommandHandler("lang", language_command))
 
-ptb_app.add_handler(CallbackQueryHandler(handle_language_selection, pattern="^lang_"))
+# callback queries – handler אחד עם lookup במילון במקום רשימת regex-ים
+_CB_DISPATCH: Dict[str, Callable] = {
+    "digital_asset_info": digital_asset_info,
+    "join": join_callback,
+    "support": support_callback,
+    "share": share_callback,
+    "vision": vision_callback,
+    "back_main": back_main_callback,
+    "my_area": my_area_callback,
+}
+_CB_PREFIX: Tuple[Tuple[str, Callable], ...] = (
+    ("lang_", handle_language_selection),
+    ("pay_", payment_method_callback),
+    ("adm_approve:", admin_approve_callback),
+    ("adm_reject:", admin_reject_callback),
+)
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    data = query.data or ""
+    handler = _CB_DISPATCH.get(data)
+    if handler is None:
+        for prefix, prefix_handler in _CB_PREFIX:
+            if data.startswith(prefix):
+                handler = prefix_handler
+                break
+    if handler is None:
+        await query.answer()
+        return
+    await handler(update, context)
 
-ptb_app.add_handler(CallbackQueryHandler(digital_asset_info, pattern="^digital_asset_info$"))
-ptb_app.add_handler(CallbackQueryHandler(join_callback, pattern="^join$"))
-ptb_app.add_handler(CallbackQueryHandler(support_callback, pattern="^support$"))
-ptb_app.add_handler(CallbackQueryHandler(share_callback, pattern="^share$"))
-ptb_app.add_handler(CallbackQueryHandler(vision_callback, pattern="^vision$"))
-ptb_app.add_handler(CallbackQueryHandler(back_main_callback, pattern="^back_main$"))
-ptb_app.add_handler(CallbackQueryHandler(payment_method_callback, pattern="^pay_"))
-ptb_app.add_handler(CallbackQueryHandler(my_area_callback, pattern="^my_area$"))
-ptb_app.add_handler(CallbackQueryHandler(admin_approve_callback, pattern="^adm_approve:"))
-ptb_app.add_handler(CallbackQueryHandler(admin_reject_callback, pattern="^adm_reject:"))
+ptb_app.add_handler(CallbackQueryHandler(dispatch_callback))
 
 # הוספת handler למקלדת יציבה
-ptb_app.add_handler(MessageHandler(filters.TEXT & filters.ChatType.PRIVATE, handle_stable_keyboard_text))
+ptb_app.add_handler(MessageHandler(filters.TEXT & filters.ChatType.PRIVATE & ~filters.COMMAND, handle_stable_keyboard_text))
 
 # כל תמונה בפרטי – נניח כאישור תשלום
 ptb_app.add_handler(MessageHandler(filters.PHOTO & filters.ChatType.PRIVATE, handle_payment_photo))
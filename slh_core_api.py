@@ -1,18 +1,24 @@
 ﻿from __future__ import annotations
 
 import os
+import threading
 import time
-from datetime import datetime
-from typing import Dict, List, Optional, Set
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 # ============================================================
 # SLHNET Core API  public config + referral MVP
 # ============================================================
 
-core_router = APIRouter(tags=["slh_core"])
+# ORJSONResponse כברירת מחדל – סריאליזציה מהירה לכל נקודות הקצה של ה-router.
+# /config/public ו-/api/token/price מחזירות bytes מוכנים ועוקפות גם אותה.
+core_router = APIRouter(tags=["slh_core"], default_response_class=ORJSONResponse)
 
 # alias so main.py can `from slh_core_api import router`
 router = core_router
@@ -42,44 +48,56 @@ class PublicConfig(BaseModel):
     meta: Dict[str, str]
 
 
+# הקונפיג הציבורי סטטי – נבנה ומסורלז ל-JSON פעם אחת בטעינת המודול
+_PUBLIC_CONFIG = PublicConfig(
+    token_price_ils=SLH_PRICE_ILS,
+    links={
+        "landing": "https://slh-nft.com/",
+        "bot": "https://t.me/Buy_My_Shop_bot",
+        "investor_telegram": "https://t.me/Osif83",
+    },
+    meta={
+        "description": "SLHNET  רשת עסקית סביב טוקן SLH, ריפרל מדורג ואקו-סיסטם של חנויות דיגיטליות.",
+        "stage": "mvp-core-api",
+    },
+)
+_PUBLIC_CONFIG_JSON = _PUBLIC_CONFIG.model_dump_json().encode()
+
+
 @core_router.get("/config/public", response_model=PublicConfig)
-def get_public_config() -> PublicConfig:
+def get_public_config() -> Response:
     """
     קונפיג ציבורי  מיועד לאתר / קליינט.
     כרגע מחזיר נתונים סטטיים + קישורים מרכזיים.
     ניתן להרחבה בהמשך.
     """
-    links = {
-        "landing": "https://slh-nft.com/",
-        "bot": "https://t.me/Buy_My_Shop_bot",
-        "investor_telegram": "https://t.me/Osif83",
-    }
-    meta = {
-        "description": "SLHNET  רשת עסקית סביב טוקן SLH, ריפרל מדורג ואקו-סיסטם של חנויות דיגיטליות.",
-        "stage": "mvp-core-api",
-    }
-    return PublicConfig(
-        token_price_ils=SLH_PRICE_ILS,
-        links=links,
-        meta=meta,
-    )
+    return Response(content=_PUBLIC_CONFIG_JSON, media_type="application/json")
+
+
+# תשובת המחיר המוכנה (bytes) ותוקפה – נבנית מחדש לכל היותר פעם בשנייה,
+# בגבול שנייה שלמה, כך ש-updated_at (ברזולוציית שניות) תמיד עדכני
+_token_price_cache: Dict[str, object] = {"expires": 0, "body": b""}
 
 
 @core_router.get("/api/token/price")
-def get_token_price():
+def get_token_price() -> Response:
     """
     נקודת קצה פשוטה שמחזירה את מחיר ה-SLH בשקלים.
     כרגע: קונפיג ידני דרך SLH_PRICE_ILS או ברירת מחדל 444.
     בעתיד ניתן לחבר ל-Oracle / בורסה חיצונית.
     """
-    return {
-        "symbol": SLH_SYMBOL,
-        "contract": SLH_CONTRACT,
-        "decimals": SLH_DECIMALS,
-        "price_ils": SLH_PRICE_ILS,
-        "source": "manual_config",
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }
+    now = int(time.time())
+    if now >= _token_price_cache["expires"]:
+        _token_price_cache["body"] = orjson.dumps({
+            "symbol": SLH_SYMBOL,
+            "contract": SLH_CONTRACT,
+            "decimals": SLH_DECIMALS,
+            "price_ils": SLH_PRICE_ILS,
+            "source": "manual_config",
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + "Z",
+        })
+        _token_price_cache["expires"] = now + 1
+    return Response(content=_token_price_cache["body"], media_type="application/json")
 
 
 # ============================================================
@@ -124,9 +142,33 @@ class TrackVisitRequest(BaseModel):
 
 # "Fake DB" בזיכרון  MVP בלבד.
 # בהמשך אפשר להחליף למשהו מבוסס Postgres דרך db.py
-_REFERRAL_GRAPH: Dict[int, List[int]] = {}
+# הגרף מחולק ל-shards לפי referrer_id, כל shard עם נעילה משלו –
+# ה-handlers הסינכרוניים רצים ב-threadpool ולא נחסמים על נעילה גלובלית אחת.
+# המצב פר-תהליך; עם כמה workers צריך מקור אמת משותף (Postgres / Redis).
+_N_SHARDS = 16
+_SHARD_MASK = _N_SHARDS - 1
+_SHARDS: List[Dict[int, Set[int]]] = [{} for _ in range(_N_SHARDS)]
+_SHARD_LOCKS: List[threading.Lock] = [threading.Lock() for _ in range(_N_SHARDS)]
+_SHARD_RELATIONS: List[int] = [0] * _N_SHARDS
+
+# גרסת הגרף – עולה בכל קשת חדשה; משמשת כמפתח למטמון העצים
+_GRAPH_VERSION = 0
 _USER_ALIASES: Dict[int, str] = {}
-_VISITS: List[Dict[str, object]] = []
+# חלון מוגבל של אירועי ביקור אחרונים – הזיכרון לא גדל ללא גבול;
+# _VISITS_TOTAL סופר את כל הביקורים מאז עליית התהליך
+_VISITS_MAX = 100_000
+_VISITS: deque = deque(maxlen=_VISITS_MAX)
+_VISITS_TOTAL = 0
+# track_visit רץ ב-threadpool – הגדלת המונה תחת נעילה
+_VISITS_LOCK = threading.Lock()
+
+# אינדקסים שמתוחזקים בכל הוספת קשת – הסטטיסטיקות לא סורקות את הגרף כולו.
+# _ROOTS (משתמשים בלי מפנה) מתוחזק ישירות, כך שהשורשים עולים O(roots) ולא O(users).
+# כל העדכונים (כולל גרסת הגרף) תחת נעילה אחת, כדי ש-_ROOTS יישאר עקבי
+_ALL_USERS: Set[int] = set()
+_HAS_PARENT: Set[int] = set()
+_ROOTS: Set[int] = set()
+_INDEX_LOCK = threading.Lock()
 
 
 def _add_relation(referrer_id: int, visitor_id: int) -> None:
@@ -134,51 +176,108 @@ def _add_relation(referrer_id: int, visitor_id: int) -> None:
     רישום קשר ריפרל בסיסי: referrer -> visitor.
     אם כבר קיים, לא נוסיף שוב.
     """
+    global _GRAPH_VERSION
     if referrer_id == visitor_id:
         return
 
-    children = _REFERRAL_GRAPH.setdefault(referrer_id, [])
-    if visitor_id not in children:
-        children.append(visitor_id)
-
-
-def _collect_all_users() -> Set[int]:
-    users: Set[int] = set()
-    for src, dsts in _REFERRAL_GRAPH.items():
-        users.add(src)
-        users.update(dsts)
-    return users
+    i = referrer_id & _SHARD_MASK
+    with _SHARD_LOCKS[i]:
+        children = _SHARDS[i].setdefault(referrer_id, set())
+        if visitor_id in children:
+            return
+        children.add(visitor_id)
+        _SHARD_RELATIONS[i] += 1
+    with _INDEX_LOCK:
+        _ALL_USERS.add(referrer_id)
+        _ALL_USERS.add(visitor_id)
+        _HAS_PARENT.add(visitor_id)
+        _ROOTS.discard(visitor_id)
+        if referrer_id not in _HAS_PARENT:
+            _ROOTS.add(referrer_id)
+        _GRAPH_VERSION += 1
+
+
+def _sorted_children(user_id: int) -> List[int]:
+    i = user_id & _SHARD_MASK
+    with _SHARD_LOCKS[i]:
+        return sorted(_SHARDS[i].get(user_id, ()))
 
 
 def _find_roots() -> List[int]:
     """
     משתמשים שאין להם 'מפנה מעליהם'  נחשבים שורשים בגרף.
     """
-    all_users = _collect_all_users()
-    all_children: Set[int] = set()
-    for dsts in _REFERRAL_GRAPH.values():
-        all_children.update(dsts)
-    roots = sorted(all_users - all_children)
+    with _INDEX_LOCK:
+        roots = list(_ROOTS)
+    roots.sort()
     return roots
 
 
-def _build_tree(user_id: int, depth: int = 0, max_depth: int = 6) -> ReferralNode:
+def _assemble_tree(root_id: int, make_node: Callable, max_depth: int = 6):
+    """
+    בניית עץ ריפרל איטרטיבית.
+    שלב 1 – BFS מהשורש: כל משתמש מקבל את העומק הרדוד ביותר שבו הוא מופיע,
+    וילדיו נקראים פעם אחת בלבד (רק לצמתים עד max_depth).
+    שלב 2 – בנייה post-order עם מחסנית: כל צומת נבנה פעם אחת ע"י
+    make_node(user_id, children) עם תת-העץ המלא מהמופע הרדוד, ומשותף בכל
+    מקום שבו הוא מופיע. ילד שהוא אב קדמון במסלול הנוכחי (מעגל) או שמעבר
+    ל-max_depth מוחזר כעלה – כך מעגלים נחתכים מבנית.
     """
-    בניית עץ ריפרל רקורסיבי עד עומק מוגבל (כדי להימנע ממעגלים אינסופיים).
+    depth: Dict[int, int] = {root_id: 0}
+    children_of: Dict[int, List[int]] = {}
+    order = [root_id]
+    for uid in order:  # order גדל תוך כדי – תור BFS
+        # סדר דטרמיניסטי לתשובה – ממיינים רק בזמן בניית העץ
+        children_ids = children_of[uid] = _sorted_children(uid)
+        d = depth[uid] + 1
+        if d > max_depth:
+            continue
+        for child_id in children_ids:
+            if child_id not in depth:
+                depth[child_id] = d
+                order.append(child_id)
+
+    built: Dict[int, object] = {}
+    on_path: Set[int] = set()
+    stack = [(root_id, False)]
+    while stack:
+        uid, expanded = stack.pop()
+        if expanded:
+            on_path.discard(uid)
+            built[uid] = make_node(uid, [
+                built[child_id] if child_id in built else make_node(child_id, [])
+                for child_id in children_of[uid]
+            ])
+            continue
+        if uid in built or uid in on_path:
+            continue
+        on_path.add(uid)
+        stack.append((uid, True))
+        for child_id in reversed(children_of[uid]):
+            if child_id in children_of and child_id not in built and child_id not in on_path:
+                stack.append((child_id, False))
+    return built[root_id]
+
+
+def _referral_dict(uid: int, children: list) -> Dict[str, object]:
+    return {"user_id": uid, "username": _USER_ALIASES.get(uid), "children": children}
+
+
+def _serialize_tree_json(root_id: int, max_depth: int = 6) -> bytes:
     """
-    if depth > max_depth:
-        return ReferralNode(user_id=user_id, username=_USER_ALIASES.get(user_id), children=[])
+    העץ כ-JSON ישירות מהגרף – dicts פשוטים ל-orjson, בלי מודלי Pydantic
+    בדרך (ReferralNode נשאר רק לסכמת ה-OpenAPI).
+    """
+    return orjson.dumps(_assemble_tree(root_id, _referral_dict, max_depth))
 
-    children_ids = _REFERRAL_GRAPH.get(user_id, [])
-    children_nodes = [
-        _build_tree(child_id, depth=depth + 1, max_depth=max_depth)
-        for child_id in children_ids
-    ]
-    return ReferralNode(
-        user_id=user_id,
-        username=_USER_ALIASES.get(user_id),
-        children=children_nodes,
-    )
+
+@lru_cache(maxsize=1024)
+def _tree_json_cached(user_id: int, version: int) -> bytes:
+    """
+    מטמון עצים לפי (user_id, גרסת גרף). כל שינוי בגרף מעלה את הגרסה,
+    כך שרשומה ישנה לעולם לא מוגשת ונפלטת מה-LRU באופן טבעי.
+    """
+    return _serialize_tree_json(user_id)
 
 
 @core_router.post("/api/referral/track_visit")
@@ -188,6 +287,7 @@ def track_visit(req: TrackVisitRequest):
     * אם יש visitor_id  מוסיף קשת בגרף referrer -> visitor.
     * שומר אירוע ב-LOG בזיכרון (MVP).
     """
+    global _VISITS_TOTAL
     ts = req.ts or time.time()
     event = {
         "referrer_id": req.referrer_id,
@@ -196,6 +296,8 @@ def track_visit(req: TrackVisitRequest):
         "ts": ts,
     }
     _VISITS.append(event)
+    with _VISITS_LOCK:
+        _VISITS_TOTAL += 1
 
     if req.visitor_id:
         _add_relation(req.referrer_id, req.visitor_id)
@@ -213,32 +315,21 @@ def get_referral_stats() -> ReferralStats:
     סטטיסטיקות עיקריות על גרף ההפניות.
     כרגע על בסיס הזיכרון בתהליך.
     """
-    all_users = _collect_all_users()
-    roots = _find_roots()
-    total_relations = sum(len(v) for v in _REFERRAL_GRAPH.values())
-
     return ReferralStats(
-        total_users=len(all_users),
-        total_relations=total_relations,
-        total_visits=len(_VISITS),
-        roots=roots,
+        total_users=len(_ALL_USERS),
+        total_relations=sum(_SHARD_RELATIONS),
+        total_visits=_VISITS_TOTAL,
+        roots=_find_roots(),
     )
 
 
 @core_router.get("/api/referral/tree/{user_id}", response_model=ReferralNode)
-def get_referral_tree(user_id: int) -> ReferralNode:
+def get_referral_tree(user_id: int) -> Response:
     """
     מחזיר עץ ריפרל למשתמש נתון (כולל הילדים שלו ברמות הבאות).
     אם אין נתונים  מחזירים צומת ריק (ילדים = []) כדי לא לשבור קליינט.
     """
-    all_users = _collect_all_users()
-    if user_id not in all_users and user_id not in _REFERRAL_GRAPH:
-        # אין עץ רשום עבור המשתמש  מחזירים צומת בסיסי.
-        return ReferralNode(
-            user_id=user_id,
-            username=_USER_ALIASES.get(user_id),
-            children=[],
-        )
-
-    return _build_tree(user_id)
-
+    return Response(
+        content=_tree_json_cached(user_id, _GRAPH_VERSION),
+        media_type="application/json",
+    )
@@ -3,9 +3,11 @@ from datetime import datetime
 from typing import List, Dict, Any
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-router = APIRouter()
+# ORJSONResponse – סריאליזציה מהירה (orjson) לכל נקודות הקצה של ה-router
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 class PublicConfig(BaseModel):
@@ -34,36 +36,40 @@ class SaleItem(BaseModel):
     timestamp: str
 
 
+# ערכי ה-ENV לא משתנים במהלך חיי התהליך – הקונפיג והמחיר נבנים פעם אחת בטעינה
+_SLH_PRICE = float(os.getenv("SLH_NIS", "444"))
+
+_PUBLIC_CONFIG = PublicConfig(
+    project="SLHNET",
+    network="BSC Mainnet",
+    chain_id=56,
+    rpc_url="https://bsc-dataseed.binance.org/",
+    token_address="0xACb0A09414CEA1C879c67bB7A877E4e19480f022",
+    token_symbol="SLH",
+    token_decimals=15,
+    slh_price_nis=_SLH_PRICE,
+    urls={
+        "bot": os.getenv("WEBHOOK_URL", "").replace("/webhook", ""),
+        "business_group": os.getenv("GROUP_STATIC_INVITE", ""),
+        "paybox": os.getenv("PAYBOX_URL", ""),
+        "bit": os.getenv("BIT_URL", ""),
+        "paypal": os.getenv("PAYPAL_URL", ""),
+    },
+)
+
+_TOKEN_PRICE_BASE = TokenPrice(symbol="SLH", price_nis=_SLH_PRICE, updated_at="")
+
+
 @router.get("/config/public", response_model=PublicConfig)
 async def get_public_config():
-    slh_price = float(os.getenv("SLH_NIS", "444"))
-
-    return PublicConfig(
-        project="SLHNET",
-        network="BSC Mainnet",
-        chain_id=56,
-        rpc_url="https://bsc-dataseed.binance.org/",
-        token_address="0xACb0A09414CEA1C879c67bB7A877E4e19480f022",
-        token_symbol="SLH",
-        token_decimals=15,
-        slh_price_nis=slh_price,
-        urls={
-            "bot": os.getenv("WEBHOOK_URL", "").replace("/webhook", ""),
-            "business_group": os.getenv("GROUP_STATIC_INVITE", ""),
-            "paybox": os.getenv("PAYBOX_URL", ""),
-            "bit": os.getenv("BIT_URL", ""),
-            "paypal": os.getenv("PAYPAL_URL", ""),
-        },
-    )
+    return _PUBLIC_CONFIG
 
 
 @router.get("/api/token/price", response_model=TokenPrice)
 async def get_token_price():
-    slh_price = float(os.getenv("SLH_NIS", "444"))
-    return TokenPrice(
-        symbol="SLH",
-        price_nis=slh_price,
-        updated_at=datetime.utcnow().isoformat() + "Z",
+    # רק updated_at דינמי – העתקה ללא ולידציה מחדש
+    return _TOKEN_PRICE_BASE.model_copy(
+        update={"updated_at": datetime.utcnow().isoformat() + "Z"}
     )
 
 
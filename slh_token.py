@@ -5,10 +5,12 @@
 - Verify on-chain sale tx (Transfer from user -> treasury)
 \"\"\"
 
+import asyncio
 import os
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
-from web3 import Web3
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
 from web3.exceptions import TransactionNotFound
 
 SLH_CHAIN_ID = 56
@@ -25,7 +27,9 @@ TREASURY_ADDRESS = os.environ.get(
     "0x000000000000000000000000000000000000dEaD"  # replace with your real treasury address
 )
 
-w3 = Web3(Web3.HTTPProvider(SLH_RPC_URL))
+# לקוח אסינכרוני – קריאות RPC לא חוסמות את ה-event loop של FastAPI;
+# ה-provider מחזיק session HTTP משותף לכל הקריאות
+w3 = AsyncWeb3(AsyncHTTPProvider(SLH_RPC_URL))
 
 ERC20_ABI = [
     {
@@ -66,7 +70,23 @@ SLH_CONTRACT = w3.eth.contract(
     abi=ERC20_ABI,
 )
 
+# balanceOf(address) מקודד מראש: selector קבוע + כתובת מרופדת ל-32 בתים,
+# כך שקריאת היתרה לא עוברת דרך קידוד ה-ABI של web3 בכל פעם
+_BALANCE_OF_SELECTOR = Web3.to_hex(Web3.keccak(text="balanceOf(address)")[:4])
+_CONTRACT_ADDR = SLH_CONTRACT.address
+_SLH_DIVISOR = 10 ** SLH_TOKEN_DECIMALS
 
+# כתובות סטטיות – checksum (keccak) מחושב פעם אחת
+_TOKEN_ADDR_CS = _CONTRACT_ADDR
+_TREASURY_CS_DEFAULT = Web3.to_checksum_address(TREASURY_ADDRESS)
+
+# topic0 של Transfer(address,address,uint256) – לסינון לוגים בלי פענוח ABI מלא
+_TRANSFER_TOPIC = Web3.keccak(text="Transfer(address,address,uint256)")
+
+
+# ארנקים חוזרים שוב ושוב בין אימותים – הבדיקה וה-checksum (keccak) נשמרים במטמון.
+# is_valid_bsc_address לא מנרמל רישיות: כתובת mixed-case עם checksum שגוי נשארת לא תקינה.
+@lru_cache(maxsize=4096)
 def is_valid_bsc_address(address: str) -> bool:
     try:
         return w3.is_address(address)
@@ -74,35 +94,38 @@ def is_valid_bsc_address(address: str) -> bool:
         return False
 
 
-def checksum(address: str) -> str:
+@lru_cache(maxsize=4096)
+def _checksum_normalized(address: str) -> str:
     return Web3.to_checksum_address(address)
 
 
-def get_slh_balance(address: str) -> Optional[float]:
+def checksum(address: str) -> str:
+    return _checksum_normalized(address.strip().lower())
+
+
+async def get_slh_balance(address: str) -> Optional[float]:
     if not is_valid_bsc_address(address):
         return None
     try:
-        raw = SLH_CONTRACT.functions.balanceOf(checksum(address)).call()
-        return raw / (10 ** SLH_TOKEN_DECIMALS)
+        data = _BALANCE_OF_SELECTOR + checksum(address)[2:].lower().rjust(64, "0")
+        raw = int.from_bytes(await w3.eth.call({"to": _CONTRACT_ADDR, "data": data}), "big")
+        return raw / _SLH_DIVISOR
     except Exception:
         return None
 
 
-def verify_slh_sale_tx(
+async def verify_slh_sale_tx(
     tx_hash: str,
     expected_from: str,
     min_amount: float,
     treasury_address: Optional[str] = None,
 ) -> Tuple[bool, str, Optional[float], Optional[int]]:
-    if treasury_address is None:
-        treasury_address = TREASURY_ADDRESS
-
     try:
         tx_hash = tx_hash.strip()
         if not tx_hash.startswith("0x"):
             return False, "tx_hash לא תקין", None, None
 
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
+        receipt = await w3.eth.get_transaction_receipt(tx_hash)
     except TransactionNotFound:
         return False, "העסקה לא נמצאה בשרשרת (TransactionNotFound)", None, None
     except Exception as e:
@@ -112,20 +135,28 @@ def verify_slh_sale_tx(
         return False, "העסקה נכשלה (status != 1)", None, receipt.blockNumber
 
     from_addr_checksum = checksum(expected_from)
-    treasury_checksum = checksum(treasury_address)
-    token_addr_checksum = checksum(SLH_TOKEN_ADDRESS)
+    if treasury_address is None or treasury_address == TREASURY_ADDRESS:
+        treasury_checksum = _TREASURY_CS_DEFAULT
+    else:
+        treasury_checksum = checksum(treasury_address)
+    token_addr_checksum = _TOKEN_ADDR_CS
 
     amount_found = 0
 
     try:
-        events = SLH_CONTRACT.events.Transfer().process_receipt(receipt)
-        for ev in events:
+        # from/to הם topics מאונדקסים: 32 בתים, הכתובת ב-20 האחרונים
+        from_bytes = bytes.fromhex(from_addr_checksum[2:])
+        treasury_bytes = bytes.fromhex(treasury_checksum[2:])
+        for lg in receipt.logs:
+            topics = lg.topics
             if (
-                ev["address"] == token_addr_checksum
-                and ev["args"]["from"] == from_addr_checksum
-                and ev["args"]["to"] == treasury_checksum
+                lg.address == token_addr_checksum
+                and len(topics) == 3
+                and topics[0] == _TRANSFER_TOPIC
+                and topics[1][-20:] == from_bytes
+                and topics[2][-20:] == treasury_bytes
             ):
-                amount_found += ev["args"]["value"]
+                amount_found += int.from_bytes(lg.data, "big")
 
         if amount_found == 0:
             return (
@@ -135,7 +166,7 @@ def verify_slh_sale_tx(
                 receipt.blockNumber,
             )
 
-        amount_slh = amount_found / (10 ** SLH_TOKEN_DECIMALS)
+        amount_slh = amount_found / _SLH_DIVISOR
         if amount_slh < min_amount:
             return (
                 False,
@@ -148,3 +179,31 @@ def verify_slh_sale_tx(
 
     except Exception as e:
         return False, f"שגיאה בניתוח האירועים: {e}", None, receipt.blockNumber
+
+
+# מגבלת בקשות RPC במקביל – שומר על מגבלות ספק ה-RPC באימות מרובה
+_RPC_CONCURRENCY = int(os.environ.get("BSC_RPC_CONCURRENCY", "20"))
+_RPC_SEM = asyncio.Semaphore(_RPC_CONCURRENCY)
+
+
+async def _verify_limited(
+    tx_hash: str,
+    expected_from: str,
+    min_amount: float,
+    treasury_address: Optional[str],
+) -> Tuple[bool, str, Optional[float], Optional[int]]:
+    async with _RPC_SEM:
+        return await verify_slh_sale_tx(tx_hash, expected_from, min_amount, treasury_address)
+
+
+async def verify_many(
+    tx_hashes: Iterable[str],
+    expected_from: str,
+    min_amount: float,
+    treasury_address: Optional[str] = None,
+) -> List[Tuple[bool, str, Optional[float], Optional[int]]]:
+    """אימות כמה עסקאות במקביל; התוצאות באותו סדר כמו tx_hashes"""
+    return await asyncio.gather(*(
+        _verify_limited(h, expected_from, min_amount, treasury_address)
+        for h in tx_hashes
+    ))
@@ -1,21 +1,54 @@
 ﻿import os
+import threading
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 try:
     import psycopg2  # type: ignore
+    import psycopg2.pool  # type: ignore
 except Exception:
     psycopg2 = None  # type: ignore
 
-router = APIRouter()
+# ORJSONResponse – סריאליזציה מהירה (orjson) לכל נקודות הקצה של ה-router
+router = APIRouter(default_response_class=ORJSONResponse)
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+# pool חיבורים משותף – נוצר בעצלות בשימוש הראשון (כמו ב-db.py)
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool זורק PoolError כשהוא מלא – הסמפור גורם לממתינים לחכות
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
 
 
 def _get_conn():
+    global _pool
     if not DATABASE_URL or psycopg2 is None:
         return None
-    return psycopg2.connect(DATABASE_URL)
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL
+                )
+    _pool_slots.acquire()
+    try:
+        return _pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def _put_conn(conn):
+    """מחזיר חיבור ל-pool; חיבור שנסגר נזרק במקום להיות ממוחזר"""
+    try:
+        _pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _pool_slots.release()
 
 
 def _ensure_tables(conn):
@@ -67,6 +100,17 @@ def _ensure_tables(conn):
             )
 
 
+_TABLES_READY = False
+
+
+def _ensure_tables_once(conn):
+    """DDL רץ פעם אחת לתהליך ולא בכל בקשה"""
+    global _TABLES_READY
+    if not _TABLES_READY:
+        _ensure_tables(conn)
+        _TABLES_READY = True
+
+
 class PublicConfig(BaseModel):
     project_name: str
     bot_link: str
@@ -127,24 +171,30 @@ BOT_USERNAME = os.getenv("BOT_USERNAME", "Buy_My_Shop_bot")
 GROUP_INVITE = os.getenv("GROUP_STATIC_INVITE")
 
 
+# הקונפיג והמחיר סטטיים לאורך חיי התהליך – נבנים פעם אחת בטעינת המודול
+_PUBLIC_CONFIG = PublicConfig(
+    project_name="SLHNET  הרשת העסקית סביב SLH",
+    bot_link=f"https://t.me/{BOT_USERNAME}",
+    group_invite=GROUP_INVITE,
+    slh_nis=SLH_NIS_DEFAULT,
+    token_contract="0xACb0A09414CEA1C879c67bB7A877E4e19480f022",
+    chain_id=56,
+    network_name="BNB Smart Chain",
+    rpc_url="https://bsc-dataseed.binance.org/",
+    block_explorer="https://bscscan.com",
+)
+
+_TOKEN_PRICE = TokenPrice(symbol="SLH", official_price_nis=SLH_NIS_DEFAULT)
+
+
 @router.get("/config/public", response_model=PublicConfig)
 def get_public_config():
-    return PublicConfig(
-        project_name="SLHNET  הרשת העסקית סביב SLH",
-        bot_link=f"https://t.me/{BOT_USERNAME}",
-        group_invite=GROUP_INVITE,
-        slh_nis=SLH_NIS_DEFAULT,
-        token_contract="0xACb0A09414CEA1C879c67bB7A877E4e19480f022",
-        chain_id=56,
-        network_name="BNB Smart Chain",
-        rpc_url="https://bsc-dataseed.binance.org/",
-        block_explorer="https://bscscan.com",
-    )
+    return _PUBLIC_CONFIG
 
 
 @router.get("/api/token/price", response_model=TokenPrice)
 def get_token_price():
-    return TokenPrice(symbol="SLH", official_price_nis=SLH_NIS_DEFAULT)
+    return _TOKEN_PRICE
 
 
 @router.get("/api/posts", response_model=List[PostOut])
@@ -152,23 +202,23 @@ def api_list_posts(limit: int = Query(20, ge=1, le=100)):
     conn = _get_conn()
     if conn is None:
         return []
-    _ensure_tables(conn)
-    rows: List[Dict[str, Any]] = []
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                \"\"\"
-                SELECT id, user_id, username, title, content, share_url, created_at
-                FROM slh_posts
-                WHERE is_published = TRUE
-                ORDER BY created_at DESC
-                LIMIT %s;
-                \"\"\",
-                (limit,),
-            )
-            for r in cur.fetchall():
-                rows.append(
-                    dict(
+    try:
+        _ensure_tables_once(conn)
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    \"\"\"
+                    SELECT id, user_id, username, title, content, share_url, created_at
+                    FROM slh_posts
+                    WHERE is_published = TRUE
+                    ORDER BY created_at DESC
+                    LIMIT %s;
+                    \"\"\",
+                    (limit,),
+                )
+                # הטיפוסים מובטחים ע"י סכמת ה-DB – model_construct ללא ולידציה
+                posts = [
+                    PostOut.model_construct(
                         id=r[0],
                         user_id=r[1],
                         username=r[2],
@@ -177,8 +227,15 @@ def api_list_posts(limit: int = Query(20, ge=1, le=100)):
                         share_url=r[5],
                         created_at=r[6].isoformat() if r[6] else None,
                     )
-                )
-    return [PostOut(**r) for r in rows]
+                    for r in cur.fetchall()
+                ]
+    finally:
+        _put_conn(conn)
+    return posts
+
+
+_SALES_STREAM_THRESHOLD = 100
+_SALES_STREAM_ITERSIZE = 100
 
 
 @router.get("/api/token/sales", response_model=List[TokenSaleOut])
@@ -186,23 +243,27 @@ def api_list_token_sales(limit: int = Query(50, ge=1, le=200)):
     conn = _get_conn()
     if conn is None:
         return []
-    _ensure_tables(conn)
-    rows: List[Dict[str, Any]] = []
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                \"\"\"
-                SELECT id, user_id, username, wallet_address,
-                       amount_slh, price_nis, status, tx_hash, created_at
-                FROM slh_token_sales
-                ORDER BY created_at DESC
-                LIMIT %s;
-                \"\"\",
-                (limit,),
-            )
-            for r in cur.fetchall():
-                rows.append(
-                    dict(
+    try:
+        _ensure_tables_once(conn)
+        with conn:
+            # רק לתוצאות גדולות: cursor בצד השרת – השורות מגיעות במנות ולא נטענות
+            # כולן לדרייבר מראש. מתחת לסף cursor רגיל (round-trip אחד) מהיר יותר
+            streaming = limit > _SALES_STREAM_THRESHOLD
+            with conn.cursor(name="sales_stream" if streaming else None) as cur:
+                if streaming:
+                    cur.itersize = _SALES_STREAM_ITERSIZE
+                cur.execute(
+                    \"\"\"
+                    SELECT id, user_id, username, wallet_address,
+                           amount_slh, price_nis, status, tx_hash, created_at
+                    FROM slh_token_sales
+                    ORDER BY created_at DESC
+                    LIMIT %s;
+                    \"\"\",
+                    (limit,),
+                )
+                sales = [
+                    TokenSaleOut.model_construct(
                         id=r[0],
                         user_id=r[1],
                         username=r[2],
@@ -213,35 +274,43 @@ def api_list_token_sales(limit: int = Query(50, ge=1, le=200)):
                         tx_hash=r[7],
                         created_at=r[8].isoformat() if r[8] else None,
                     )
-                )
-    return [TokenSaleOut(**r) for r in rows]
+                    for r in cur
+                ]
+    finally:
+        _put_conn(conn)
+    return sales
+
+
+# התוכניות סטטיות – נבנות פעם אחת, וכך גם ממוצע ה-APY
+_STAKING_PLANS: List[StakingPlan] = [
+    StakingPlan(
+        code="starter",
+        name="Starter",
+        lock_days=30,
+        apy_target=0.10,
+        description="סטייקינג בסיסי  מיועד למשתמשים חדשים. תשואה מטרה שנתית עד ~10% בהתאם לרווחי המערכת.",
+    ),
+    StakingPlan(
+        code="business",
+        name="Business",
+        lock_days=90,
+        apy_target=0.18,
+        description="סטייקינג לעסקים ושותפים. תשואה מטרה עד ~18% לשנה, נגזרת מעמלות, שירותים וסטייקינג בלוקצ'יין.",
+    ),
+    StakingPlan(
+        code="pro",
+        name="Pro",
+        lock_days=180,
+        apy_target=0.24,
+        description="למשקיעים רציניים בלבד  דורש בדיקת התאמה. חלק מהרווחים חוזרים לרזרבה.",
+    ),
+]
+_AVG_APY = sum(p.apy_target for p in _STAKING_PLANS) / len(_STAKING_PLANS) if _STAKING_PLANS else 0.0
 
 
 @router.get("/api/staking/plans", response_model=List[StakingPlan])
 def api_staking_plans():
-    return [
-        StakingPlan(
-            code="starter",
-            name="Starter",
-            lock_days=30,
-            apy_target=0.10,
-            description="סטייקינג בסיסי  מיועד למשתמשים חדשים. תשואה מטרה שנתית עד ~10% בהתאם לרווחי המערכת.",
-        ),
-        StakingPlan(
-            code="business",
-            name="Business",
-            lock_days=90,
-            apy_target=0.18,
-            description="סטייקינג לעסקים ושותפים. תשואה מטרה עד ~18% לשנה, נגזרת מעמלות, שירותים וסטייקינג בלוקצ'יין.",
-        ),
-        StakingPlan(
-            code="pro",
-            name="Pro",
-            lock_days=180,
-            apy_target=0.24,
-            description="למשקיעים רציניים בלבד  דורש בדיקת התאמה. חלק מהרווחים חוזרים לרזרבה.",
-        ),
-    ]
+    return _STAKING_PLANS
 
 
 @router.get("/api/staking/summary", response_model=StakingSummary)
@@ -250,29 +319,27 @@ def api_staking_summary():
     total_locked = 0.0
     investors = 0
     if conn is not None:
-        _ensure_tables(conn)
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    \"\"\"
-                    SELECT COALESCE(SUM(amount_slh), 0), COUNT(DISTINCT user_id)
-                    FROM slh_staking_positions
-                    WHERE status = 'active';
-                    \"\"\"
-                )
-                res = cur.fetchone()
-                if res:
-                    total_locked = float(res[0] or 0)
-                    investors = int(res[1] or 0)
-
-    plans = api_staking_plans()
-    avg_apy = 0.0
-    if plans:
-        avg_apy = sum(p.apy_target for p in plans) / len(plans)
+        try:
+            _ensure_tables_once(conn)
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        \"\"\"
+                        SELECT COALESCE(SUM(amount_slh), 0), COUNT(DISTINCT user_id)
+                        FROM slh_staking_positions
+                        WHERE status = 'active';
+                        \"\"\"
+                    )
+                    res = cur.fetchone()
+                    if res:
+                        total_locked = float(res[0] or 0)
+                        investors = int(res[1] or 0)
+        finally:
+            _put_conn(conn)
 
     return StakingSummary(
         total_locked_slh=total_locked,
         total_investors=investors,
-        avg_apy_target=avg_apy,
-        plans=plans,
+        avg_apy_target=_AVG_APY,
+        plans=_STAKING_PLANS,
     )